@@ -2,21 +2,27 @@ import os
 import pathlib
 import pandas as pd
 from exchange.binanceclient import BinanceAPIClient
+from exchange.weight_limiter import WeightLimiter
 from strategies.abstract_strategy import AbstractStrategy
 from strategies.sma_strategy import SMAStrategy
-from datetime import datetime
+from backtester.result_cache import ResultCache
+from exchange.utils import get_intervals
+from datetime import datetime, timedelta, timezone
 
 
 class BackTester:
 
     def __init__(self, strategy: [AbstractStrategy, SMAStrategy], base_asset=None, quote_asset=None,
-                 base_asset_amount=0.0, quote_asset_amount=100.0):
+                 base_asset_amount=0.0, quote_asset_amount=100.0, cache: ResultCache = None,
+                 limiter: WeightLimiter = None):
         """
         :param strategy: This is a strategy we wanna to test
         :param base_asset: This is a base asset of test
         :param quote_asset: This is a base quote of test
         :param base_asset_amount: This is amount of base asset we have in the start of testing
         :param quote_asset_amount: This is amount of quote asset we have in the start of testing
+        :param cache: If set, results of identical backtests are taken from this cache
+        :param limiter: If set, requests of historical candles wait for weight in this limiter
         """
         self.base = base_asset
         self.quote = quote_asset
@@ -25,29 +31,84 @@ class BackTester:
         self.quote_amount = quote_asset_amount
         self.assets_amount = [self.base_amount, self.quote_amount]
         self._strategy = strategy
+        self._cache = cache
+        self._limiter = limiter
 
-    def run_backtesting(self, start_day: datetime, end_day: datetime) -> None:
+    def run_backtesting(self, start_day: datetime, end_day: datetime) -> pd.DataFrame:
         """This is a core method of backtester. Here we grab a strategy and analyse data with it
 
         :param start_day: datetime from which we start our backtest
         :param end_day: datetime in which we stop our backtest
-        :return: In the end of iteration this method makes report in form of excel file
+        :return: In the end of iteration this method makes report in form of excel file and returns report data
         """
         file_name = (str(self._strategy) + self.base + self.quote + "_")  # Create name of a file for report
-        hist_data = self.get_historical_candles(start_day=start_day, end_day=end_day)  # Get historical data
+        hist_data = self.load_historical_candles(start_day=start_day, end_day=end_day)  # Get historical data
+        # Check if this backtest was already done on the same data
+        key = None
+        if self._cache is not None:
+            key = self._cache.make_key(hist_data=hist_data, strategy=self._strategy,
+                                       assets=self.assets, assets_amount=self.assets_amount)
+            result = self._cache.get(key)
+            if result is not None:
+                return self.load_result(result=result, file_name=file_name, key=key)
         hist_data[self.assets] = self.assets_amount  # Add info of our capital
-        # Prepare data for iteration
-        price_data = hist_data.loc[: self._strategy.long_term-1, :]
-        number_of_candles = hist_data.shape[0]
+        # Every backtest starts without open position (strategy could be left with it by previous run)
+        self._strategy.position_open = False
+        # Compute indicators of the strategy on the whole history at once (vectorized form)
+        price_data = self._strategy.compute_indicators(hist_data)
+        number_of_candles = price_data.shape[0]
         for i in range(self._strategy.long_term, number_of_candles):
-            # Add new data to price data
-            price_data = pd.concat([price_data, hist_data.iloc[i: i+1]])
-            # Compute data with strategy
-            price_data = self._strategy.compute(price_data=price_data, step=i)
             # Decide if we wanna buy/sell or do nothing
             self.mock_order(price_data=price_data, step=i)
         # Create report
-        self.form_report(price_data=price_data, file_name=file_name)
+        self.form_report(price_data=price_data, file_name=file_name, key=key)
+        if key is not None:
+            self._cache.put(key, {"price_data": price_data, "assets_amount": self.assets_amount,
+                                  "position_open": self._strategy.position_open})
+        return price_data
+
+    def load_result(self, result: dict, file_name: str, key: str) -> pd.DataFrame:
+        """Restore state of backtester from cached result. Report is written only if the file holds
+        report of another backtest (for example of another period with the same strategy and pair)
+
+        :param result: result from cache
+        :param file_name: name of the file in which data will be saved
+        :param key: key of the result in cache
+        :return: report data
+        """
+        price_data = result["price_data"]
+        self.base_amount, self.quote_amount = result["assets_amount"]
+        self.assets_amount = [self.base_amount, self.quote_amount]
+        self._strategy.position_open = result["position_open"]
+        if self._read_report_key(file_name) != key:
+            price_data.to_excel(self.get_report_dir() + file_name + "backtest.xlsx")
+            self._write_report_key(file_name, key)
+        return price_data
+
+    def load_historical_candles(self, start_day: datetime, end_day: datetime) -> pd.DataFrame:
+        """Historical candles from cache if this period is closed and was loaded before, otherwise from exchange
+
+        :param start_day: datetime from which we start our backtest
+        :param end_day: datetime in which we stop our backtest
+        :return: pd.DataFrame with historical candles
+        """
+        if self._cache is None or not self.is_closed_period(end_day):
+            return self.get_historical_candles(start_day=start_day, end_day=end_day)
+        key = self._cache.make_candles_key(strategy=self._strategy, pair=self.base + self.quote,
+                                           start_day=start_day, end_day=end_day)
+        hist_data = self._cache.get(key)
+        if hist_data is None:
+            hist_data = self.get_historical_candles(start_day=start_day, end_day=end_day)
+            self._cache.put(key, hist_data)
+        return hist_data
+
+    def is_closed_period(self, end_day: datetime) -> bool:
+        """
+        :return: True if all candles of the period are closed (history of the period will not change)
+        """
+        interval = get_intervals([self._strategy.interval])[self._strategy.interval]
+        # Client reads dates as UTC
+        return end_day.replace(tzinfo=timezone.utc) + timedelta(milliseconds=interval) <= datetime.now(timezone.utc)
 
     def get_historical_candles(self, start_day: datetime, end_day: datetime) -> pd.DataFrame:
         """This is a support method which extracts historical data from exchange
@@ -57,6 +118,7 @@ class BackTester:
         :return: pd.DataFrame with historical candles
         """
         client = BinanceAPIClient(base_asset=self.base, quote_asset=self.quote, mode="prod")
+        client.limiter = self._limiter
         client.get_candlestick_for_given_time(start_day, end_day, self._strategy.interval)
         candles_data = client.candlesticks_to_pandas()
         return self._strategy.candle_preprocessing(candles_data)
@@ -95,16 +157,43 @@ class BackTester:
             # If nothing happen keep writing info about our assets
             price_data.loc[step, self.assets] = self.assets_amount
 
-    def form_report(self, price_data: pd.DataFrame, file_name: str) -> None:
+    def form_report(self, price_data: pd.DataFrame, file_name: str, key: str = None) -> None:
         """Method grabs price data after backtesting, computes info about capital on whole period of backtesting
         and saves report in form of excel file
 
         :param price_data: dataframe of price data after backtesting
         :param file_name: name of the file in which data will be saved
+        :param key: key of the result in cache (it is saved next to the report)
         """
         price_data["capital"] = price_data[self.quote] + price_data[self.base] * price_data["close_price"]
         price_data["close_time"] = price_data["close_time"].dt.tz_localize(None)
-        # Create directory for reports (if not exists)
+        price_data.to_excel(self.get_report_dir() + file_name + "backtest.xlsx")
+        self._write_report_key(file_name, key)
+
+    def _read_report_key(self, file_name: str):
+        """
+        :return: key of cached result which report file holds (None if it is unknown)
+        """
+        try:
+            with open(self.get_report_dir() + file_name + "backtest.key", "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_report_key(self, file_name: str, key: str = None) -> None:
+        path = self.get_report_dir() + file_name + "backtest.key"
+        if key is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            with open(path, "w") as f:
+                f.write(key)
+
+    @staticmethod
+    def get_report_dir() -> str:
+        """
+        :return: directory for reports (it is created if not exists)
+        """
         script_dir = str(pathlib.PureWindowsPath(__file__).parent.parent.as_posix())
         dir_name = script_dir + "/back_test_files/"
         try:
@@ -112,4 +201,4 @@ class BackTester:
             print("Directory ", dir_name, " Created ")
         except FileExistsError:
             pass
-        price_data.to_excel(dir_name + file_name + "backtest.xlsx")
+        return dir_name
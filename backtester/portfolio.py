@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from backtester.backtester import BackTester
+from backtester.robustness import crossover_trades
+from exchange.weight_limiter import WeightLimiter
+from strategies.sma_strategy import SMAStrategy
+
+
+class PortfolioBackTester:
+    """Backtest of SMAStrategy on many pairs which share one balance of quote asset.
+
+    Close prices of all pairs are aligned on a common time grid (array pairs x candles),
+    SMA crossovers and positions of all pairs are computed at once with arrays.
+    Only candles with trades are processed in time order: every buy spends trading_capital
+    of the current free quote balance, every sell returns all base asset of the pair to it
+    (the same rules as in BackTester.mock_order). On a candle sells are done before buys.
+    """
+
+    def __init__(self, strategy: SMAStrategy, base_assets: list = None, quote_asset=None, quote_asset_amount=100.0,
+                 workers=4, limiter: WeightLimiter = None):
+        """
+        :param strategy: This is a strategy we wanna to test
+        :param base_assets: This is a list of base assets of test
+        :param quote_asset: This is a quote asset of all pairs
+        :param quote_asset_amount: This is amount of quote asset we have in the start of testing
+        :param workers: amount of pairs which history is loaded concurrently
+        :param limiter: limiter of request weight shared by all downloads (a new one with default limit if None).
+            A year of 5m candles is 106 requests of weight 5 per pair, so with limit 1100 weight per minute
+            history of 30 pairs is loaded in about 15 minutes
+        """
+        self.bases = list(base_assets or [])
+        self.quote = quote_asset
+        self.quote_amount = quote_asset_amount
+        self.workers = workers
+        self._limiter = limiter if limiter is not None else WeightLimiter()
+        self._strategy = strategy
+
+    @property
+    def pairs(self) -> list:
+        return [base + self.quote for base in self.bases]
+
+    def run(self, start_day: datetime, end_day: datetime) -> tuple:
+        """Load history of all pairs, run backtest and make report in form of excel file
+
+        :param start_day: datetime from which we start our backtest
+        :param end_day: datetime in which we stop our backtest
+        :return: results of run_on_prices
+        """
+        close_times, close_prices = self.get_close_prices(start_day=start_day, end_day=end_day)
+        portfolio, pairs_pnl, trades = self.run_on_prices(close_times, close_prices)
+        self.form_report(portfolio=portfolio, pairs_pnl=pairs_pnl, trades=trades,
+                         file_name=str(self._strategy) + self.quote + "_")
+        return portfolio, pairs_pnl, trades
+
+    def get_close_prices(self, start_day: datetime, end_day: datetime) -> tuple:
+        """Load history of all pairs and align it on common close times
+
+        :return: close times (pd.DatetimeIndex) and array pairs x candles of close prices
+            (NaN before the first candle of a pair, the last price is repeated after its last candle)
+        """
+        def load(base):
+            back_tester = BackTester(strategy=self._strategy, base_asset=base, quote_asset=self.quote,
+                                     limiter=self._limiter)
+            hist_data = back_tester.get_historical_candles(start_day=start_day, end_day=end_day)
+            return hist_data.drop_duplicates("close_time").set_index("close_time")["close_price"].astype(float)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            all_prices = list(executor.map(load, self.bases))
+        prices = pd.concat(all_prices, axis=1, keys=self.pairs).sort_index().ffill()
+        return prices.index, prices.to_numpy().T
+
+    def run_on_prices(self, close_times, close_prices: np.ndarray) -> tuple:
+        """
+        :param close_times: common close times of candles (pd.DatetimeIndex)
+        :param close_prices: array pairs x candles of close prices aligned on close_times
+        :return: dataframe of portfolio (free quote, value of positions, capital and drawdown on every candle),
+            dataframe of profit of every pair on every candle (realized and unrealized) and dataframe of trades
+        """
+        pairs, number_of_candles = close_prices.shape
+        buys, sells, _ = crossover_trades(close_prices, self._strategy.short_term, self._strategy.long_term)
+        trade_candles = np.flatnonzero(buys.any(axis=0) | sells.any(axis=0))
+        trading_capital = self._strategy.trading_capital
+        # State after every candle with trades
+        quote = self.quote_amount
+        base = np.zeros(pairs)
+        cost = np.zeros(pairs)  # quote asset paid for open position
+        realized = np.zeros(pairs)
+        quote_history = np.empty(len(trade_candles))
+        base_history = np.empty((len(trade_candles), pairs))
+        cost_history = np.empty((len(trade_candles), pairs))
+        realized_history = np.empty((len(trade_candles), pairs))
+        trades = []
+        for row, candle in enumerate(trade_candles):
+            prices = close_prices[:, candle]
+            for pair in np.flatnonzero(sells[:, candle]):
+                amount = base[pair] * prices[pair]
+                quote += amount
+                realized[pair] += amount - cost[pair]
+                trades.append((candle, pair, "SELL", prices[pair], base[pair], amount))
+                base[pair] = 0.0
+                cost[pair] = 0.0
+            for pair in np.flatnonzero(buys[:, candle]):
+                amount = quote * trading_capital
+                base[pair] += amount / prices[pair]
+                cost[pair] += amount
+                quote -= amount
+                trades.append((candle, pair, "BUY", prices[pair], amount / prices[pair], amount))
+            quote_history[row] = quote
+            base_history[row] = base
+            cost_history[row] = cost
+            realized_history[row] = realized
+        # Spread state of candles with trades to all candles (row 0 -- state before the first trade)
+        rows = np.searchsorted(trade_candles, np.arange(number_of_candles), side="right")
+        quote_history = np.concatenate([[self.quote_amount], quote_history])[rows]
+        base_history = np.concatenate([np.zeros((1, pairs)), base_history])[rows].T
+        cost_history = np.concatenate([np.zeros((1, pairs)), cost_history])[rows].T
+        realized_history = np.concatenate([np.zeros((1, pairs)), realized_history])[rows].T
+
+        positions = np.where(base_history > 0, base_history * np.nan_to_num(close_prices), 0.0)
+        pnl = realized_history + positions - cost_history
+        capital = quote_history + positions.sum(axis=0)
+        portfolio = pd.DataFrame({"close_time": close_times,
+                                  self.quote: quote_history,
+                                  "positions": positions.sum(axis=0),
+                                  "capital": capital,
+                                  "drawdown": 1 - capital / np.maximum.accumulate(capital)})
+        pairs_pnl = pd.DataFrame(pnl.T, columns=self.pairs)
+        pairs_pnl.insert(0, "close_time", close_times)
+        trades = pd.DataFrame(trades, columns=["candle", "pair", "side", "price", "quantity", "amount"])
+        trades.insert(0, "close_time", close_times[trades["candle"].to_numpy(dtype=int)])
+        trades["pair"] = np.asarray(self.pairs, dtype=object)[trades["pair"].to_numpy(dtype=int)]
+        return portfolio, pairs_pnl, trades.drop(columns="candle")
+
+    @staticmethod
+    def summary(portfolio: pd.DataFrame, pairs_pnl: pd.DataFrame, trades: pd.DataFrame) -> pd.DataFrame:
+        """
+        :return: amount of trades, final profit and max drawdown of profit (both in quote asset)
+            of every pair and of the whole portfolio; max drawdown of portfolio as a fraction of its capital
+            is in 'drawdown' column of portfolio
+        """
+        pnl = pairs_pnl.drop(columns="close_time")
+        pnl["portfolio"] = portfolio["capital"] - portfolio["capital"].iloc[0]
+        trades_count = trades.groupby("pair").size()
+        trades_count["portfolio"] = len(trades)
+        return pd.DataFrame({"trades": trades_count.reindex(pnl.columns, fill_value=0).astype(int),
+                             "profit": pnl.iloc[-1],
+                             "max_drawdown": (pnl.cummax() - pnl).max()})
+
+    def form_report(self, portfolio: pd.DataFrame, pairs_pnl: pd.DataFrame, trades: pd.DataFrame,
+                    file_name: str) -> None:
+        """Save summary, equity curves and trades in form of excel file
+
+        :param file_name: name of the file in which data will be saved
+        """
+        summary = self.summary(portfolio=portfolio, pairs_pnl=pairs_pnl, trades=trades)
+        with pd.ExcelWriter(BackTester.get_report_dir() + file_name + "portfolio.xlsx") as writer:
+            summary.to_excel(writer, sheet_name="summary")
+            for sheet_name, data in [("portfolio", portfolio), ("pairs", pairs_pnl), ("trades", trades)]:
+                data = data.copy()
+                data["close_time"] = data["close_time"].dt.tz_localize(None)
+                data.to_excel(writer, sheet_name=sheet_name)
@@ -0,0 +1,107 @@
+import os
+import json
+import pickle
+import hashlib
+import pathlib
+import pandas as pd
+from datetime import datetime
+
+
+class ResultCache:
+    """Disk cache of backtest results with size-bounded LRU eviction.
+
+    Key of a result is a hash of candle data, strategy (class, str() and get_parameters()) and starting balances,
+    so a result is invalidated automatically when any of them changes.
+    Candles of closed periods are cached too (see make_candles_key), so a rerun does not need the network.
+    """
+
+    def __init__(self, directory: str = None, max_size=500 * 1024 ** 2):
+        """
+        :param directory: directory for cached results ('back_test_files/cache/' if None)
+        :param max_size: max size of the cache in bytes; least recently used results are deleted above it
+        """
+        if directory is None:
+            script_dir = str(pathlib.PureWindowsPath(__file__).parent.parent.as_posix())
+            directory = script_dir + "/back_test_files/cache/"
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(hist_data: pd.DataFrame, strategy, assets: list, assets_amount: list) -> str:
+        """
+        :param hist_data: candles used in backtest
+        :param strategy: tested strategy
+        :param assets: names of base and quote assets
+        :param assets_amount: amounts of base and quote assets in the start of backtest
+        :return: hex digest which identifies backtest
+        """
+        key_hash = hashlib.sha256()
+        key_hash.update(pd.util.hash_pandas_object(hist_data, index=True).to_numpy().tobytes())
+        # Runtime state of strategy (open position, ids of orders) is not a part of the key
+        description = {"strategy": type(strategy).__module__ + "." + type(strategy).__qualname__,
+                       "name": str(strategy),
+                       "parameters": strategy.get_parameters(),
+                       "assets": assets,
+                       "assets_amount": assets_amount}
+        key_hash.update(json.dumps(description, sort_keys=True, default=str).encode())
+        return key_hash.hexdigest()
+
+    @staticmethod
+    def make_candles_key(strategy, pair: str, start_day: datetime, end_day: datetime) -> str:
+        """
+        :param strategy: strategy which preprocesses candles (its class and candle interval are a part of the key)
+        :param pair: pair of candles
+        :param start_day: datetime from which history starts
+        :param end_day: datetime in which history ends
+        :return: hex digest which identifies historical candles
+        """
+        description = {"candles": type(strategy).__module__ + "." + type(strategy).__qualname__,
+                       "interval": strategy.interval,
+                       "pair": pair,
+                       "start_day": start_day.isoformat(),
+                       "end_day": end_day.isoformat()}
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        :return: cached result or None if there is no result with this key
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        # Mark result as recently used
+        os.utime(path)
+        return result
+
+    def put(self, key: str, result) -> None:
+        path = self._path(key)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        self._evict()
+
+    def clear(self) -> None:
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".pkl"):
+                os.remove(os.path.join(self.directory, file_name))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _evict(self) -> None:
+        """Delete least recently used results while cache is bigger than max_size"""
+        files = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.directory, file_name))
+                files.append((stat.st_mtime, stat.st_size, file_name))
+        total_size = sum(size for _, size, _ in files)
+        for _, size, file_name in sorted(files):
+            if total_size <= self.max_size:
+                break
+            os.remove(os.path.join(self.directory, file_name))
+            total_size -= size
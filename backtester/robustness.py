@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from backtester.backtester import BackTester
+from exchange.weight_limiter import WeightLimiter
+from indicators.indicators import rolling_mean
+from strategies.sma_strategy import SMAStrategy
+
+
+class RobustnessTester:
+    """Monte Carlo test of SMAStrategy on resampled price paths.
+
+    Paths are made by block bootstrap of log returns of historical close prices,
+    every path is traded only in a random window (random start and end).
+    Long/flat logic of the strategy (the same as in BackTester.mock_order) is computed
+    for a batch of paths at once with arrays, batches are spread across worker processes.
+    """
+
+    def __init__(self, strategy: SMAStrategy, base_asset=None, quote_asset=None, quote_asset_amount=100.0,
+                 paths=1000, block_size=96, min_window=0.5, batch_size=50, workers=None, seed=0,
+                 limiter: WeightLimiter = None):
+        """
+        :param strategy: This is a strategy we wanna to test
+        :param base_asset: This is a base asset of test
+        :param quote_asset: This is a base quote of test
+        :param quote_asset_amount: This is amount of quote asset we have in the start of every path
+        :param paths: amount of resampled paths
+        :param block_size: amount of candles in one block of bootstrap
+        :param min_window: min length of trading window as a fraction of history
+        :param batch_size: amount of paths computed at once in one process
+        :param workers: amount of worker processes (amount of cores if None)
+        :param seed: seed of random generator (same seed -- same paths)
+        :param limiter: limiter of request weight of history download (it can be shared with other testers)
+        """
+        self.base = base_asset
+        self.quote = quote_asset
+        self.quote_amount = quote_asset_amount
+        self.paths = paths
+        self.block_size = block_size
+        self.min_window = min_window
+        self.batch_size = batch_size
+        self.workers = workers
+        self.seed = seed
+        self._limiter = limiter
+        self._strategy = strategy
+
+    def run(self, start_day: datetime, end_day: datetime) -> pd.DataFrame:
+        """Load history, run test and make report in form of excel file
+
+        :param start_day: datetime from which history starts
+        :param end_day: datetime in which history ends
+        :return: dataframe with results of every path
+        """
+        back_tester = BackTester(strategy=self._strategy, base_asset=self.base, quote_asset=self.quote,
+                                 limiter=self._limiter)
+        hist_data = back_tester.get_historical_candles(start_day=start_day, end_day=end_day)
+        results = self.run_on_prices(hist_data["close_price"].to_numpy(dtype=float))
+        self.form_report(results=results, file_name=str(self._strategy) + self.base + self.quote + "_")
+        return results
+
+    def run_on_prices(self, close_prices: np.ndarray) -> pd.DataFrame:
+        """
+        :param close_prices: historical close prices
+        :return: dataframe with return, max drawdown, amount of trades, buy and hold return and window of every path
+        """
+        batches = [(close_prices, self._strategy.short_term, self._strategy.long_term,
+                    self._strategy.trading_capital, self.quote_amount,
+                    min(self.batch_size, self.paths - start), self.block_size, self.min_window, [self.seed, start])
+                   for start in range(0, self.paths, self.batch_size)]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(simulate_batch, *zip(*batches)))
+        return pd.concat(results, ignore_index=True)
+
+    @staticmethod
+    def summary(results: pd.DataFrame) -> pd.DataFrame:
+        """
+        :return: distributions (mean, std and quantiles) of results
+        """
+        return results[["return", "max_drawdown", "trades", "buy_and_hold_return"]] \
+            .describe(percentiles=[0.05, 0.25, 0.5, 0.75, 0.95])
+
+    def form_report(self, results: pd.DataFrame, file_name: str) -> None:
+        """Save results of every path and their distributions in form of excel file
+
+        :param results: results of run_on_prices
+        :param file_name: name of the file in which data will be saved
+        """
+        with pd.ExcelWriter(BackTester.get_report_dir() + file_name + "robustness.xlsx") as writer:
+            self.summary(results).to_excel(writer, sheet_name="summary")
+            results.to_excel(writer, sheet_name="paths")
+
+
+def bootstrap_paths(close_prices: np.ndarray, paths: int, block_size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    :return: array paths x len(close_prices) of prices made from blocks of historical log returns
+    """
+    log_returns = np.diff(np.log(close_prices))
+    block_size = min(block_size, len(log_returns))
+    number_of_blocks = -(-len(log_returns) // block_size)
+    starts = rng.integers(0, len(log_returns) - block_size + 1, size=(paths, number_of_blocks))
+    indexes = (starts[:, :, None] + np.arange(block_size)).reshape(paths, -1)[:, :len(log_returns)]
+    cumulative = np.concatenate([np.zeros((paths, 1)), np.cumsum(log_returns[indexes], axis=1)], axis=1)
+    return close_prices[0] * np.exp(cumulative)
+
+
+def crossover_trades(prices: np.ndarray, short_term: int, long_term: int, mask: np.ndarray = None) -> tuple:
+    """Trades of long/flat SMA crossover logic (signal_buy and signal_sell of SMAStrategy) on array rows x candles
+
+    :param mask: boolean array rows x candles; signals are ignored where it is False
+    :return: boolean arrays of buys and sells and array of positions after every candle (1 -- open, -1 -- closed)
+    """
+    rows, number_of_candles = prices.shape
+    candles = np.arange(number_of_candles)
+    short_sma = rolling_mean(prices, short_term)
+    long_sma = rolling_mean(prices, long_term)
+    above = short_sma > long_sma
+    below = short_sma < long_sma
+    # Crossovers: +1 -- buy signal, -1 -- sell signal
+    events = np.zeros(prices.shape, dtype=np.int8)
+    events[:, 1:] = (above[:, 1:] & below[:, :-1]).astype(np.int8) - (below[:, 1:] & above[:, :-1]).astype(np.int8)
+    if mask is not None:
+        events[~mask] = 0
+    # Position after every candle is the last signal (flat in the beginning),
+    # signal makes a trade only if it changes position (no buy when position is open and no sell when it is closed)
+    last_event = np.maximum.accumulate(np.where(events != 0, candles, -1), axis=1)
+    position = np.where(last_event >= 0, np.take_along_axis(events, np.maximum(last_event, 0), axis=1), -1)
+    previous_position = np.concatenate([np.full((rows, 1), -1), position[:, :-1]], axis=1)
+    trades = (events != 0) & (events != previous_position)
+    return trades & (events == 1), trades & (events == -1), position
+
+
+def simulate_batch(close_prices: np.ndarray, short_term: int, long_term: int, trading_capital: float,
+                   quote_amount: float, paths: int, block_size: int, min_window: float, seed) -> pd.DataFrame:
+    """Trade SMA crossovers on a batch of resampled paths (long/flat logic of BackTester.mock_order)
+
+    :return: dataframe with results of every path of the batch
+    """
+    rng = np.random.default_rng(seed)
+    prices = bootstrap_paths(close_prices, paths, block_size, rng)
+    number_of_candles = prices.shape[1]
+    candles = np.arange(number_of_candles)
+    # Random trading windows [start, end)
+    length = rng.integers(int(min_window * number_of_candles), number_of_candles + 1, size=paths)
+    start = rng.integers(0, number_of_candles - length + 1)
+    end = start + length
+    in_window = (candles >= start[:, None]) & (candles < end[:, None])
+
+    buys, sells, position = crossover_trades(prices, short_term, long_term, mask=in_window)
+    trades = buys | sells
+    # Buy spends trading_capital of quote asset, sell returns all base asset to quote asset
+    last_buy = np.maximum.accumulate(np.where(buys, candles, 0), axis=1)
+    buy_price = np.take_along_axis(prices, last_buy, axis=1)
+    quote_after_trades = quote_amount * np.cumprod(
+        np.where(sells, 1 + trading_capital * (prices / buy_price - 1), 1.0), axis=1)
+    capital = np.where(position == 1,
+                       quote_after_trades * (1 - trading_capital + trading_capital * prices / buy_price),
+                       quote_after_trades)
+    # Capital is frozen after the end of the window
+    final_capital = np.take_along_axis(capital, (end - 1)[:, None], axis=1)[:, 0]
+    capital = np.where(candles >= end[:, None], final_capital[:, None], capital)
+    running_max = np.maximum.accumulate(capital, axis=1)
+    max_drawdown = np.max(1 - capital / running_max, axis=1)
+    return pd.DataFrame({"return": final_capital / quote_amount - 1,
+                         "max_drawdown": max_drawdown,
+                         "trades": trades.sum(axis=1),
+                         "buy_and_hold_return": (np.take_along_axis(prices, (end - 1)[:, None], axis=1)[:, 0]
+                                                 / np.take_along_axis(prices, start[:, None], axis=1)[:, 0] - 1),
+                         "start": start,
+                         "end": end})
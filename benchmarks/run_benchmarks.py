@@ -0,0 +1,231 @@
+"""Offline benchmarks of hot paths of the bot on synthetic candles.
+
+Run from the root of the project:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 10000 --compare benchmarks/results/<previous>.json
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000   (1M candles take about 15 minutes a run)
+
+Results are saved in json (benchmarks/results/ by default). With --compare, medians are compared
+with previous results and the script exits with code 1 if some benchmark became slower than --threshold.
+"""
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import platform
+import tempfile
+import statistics
+import requests
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from benchmarks.synthetic import generate_close_prices, generate_klines
+from backtester.backtester import BackTester
+from exchange.binanceclient import BinanceAPIClient
+from exchange.utils import get_intervals
+from strategies.sma_strategy import SMAStrategy
+
+
+class SyntheticBackTester(BackTester):
+    """BackTester which takes candles from memory instead of exchange and writes reports to report_dir.
+    Reports are written only if write_report=True (writing of excel has its own benchmark)
+    """
+
+    def __init__(self, strategy: SMAStrategy, candles: pd.DataFrame, report_dir: str, write_report=False, **kwargs):
+        super().__init__(strategy=strategy, base_asset="BTC", quote_asset="USDT", **kwargs)
+        self._candles = candles
+        self._report_dir = report_dir
+        self.write_report = write_report
+
+    def get_historical_candles(self, start_day: datetime, end_day: datetime) -> pd.DataFrame:
+        return self._candles.copy()
+
+    def get_report_dir(self) -> str:
+        return self._report_dir
+
+    def form_report(self, price_data: pd.DataFrame, file_name: str, key: str = None) -> None:
+        if self.write_report:
+            super().form_report(price_data=price_data, file_name=file_name, key=key)
+
+
+class OfflineSession:
+    """Session which answers every request with the same body, so client code runs without network"""
+
+    def __init__(self, text: str):
+        self._content = text.encode()
+
+    def get(self, url, params=None, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response._content = self._content
+        return response
+
+
+def measure(function, repeat: int) -> dict:
+    """
+    :param function: function without arguments which is timed
+    :param repeat: amount of runs
+    :return: timings in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"repeat": repeat, "min": min(timings), "median": statistics.median(timings),
+            "mean": statistics.mean(timings)}
+
+
+def make_client(size: int, candles_interval: str) -> BinanceAPIClient:
+    """Client with synthetic candles decoded by BinanceAPIClient.get_klines"""
+    # Client does not make requests until we ask, so it works offline
+    client = BinanceAPIClient(base_asset="BTC", quote_asset="USDT", mode="prod")
+    session = OfflineSession(json.dumps(generate_klines(size, candles_interval=candles_interval)))
+    client.candlestick = client.get_klines(client.pair, candles_interval=candles_interval, depth=size, session=session)
+    return client
+
+
+def make_candles(size: int, candles_interval: str, start_time=datetime(2021, 1, 1), seed=0) -> pd.DataFrame:
+    """Candles in the form of SMAStrategy.candle_preprocessing built straight from generate_close_prices
+    (the same close times and prices as make_client gives up to rounding of the last decimal), so large
+    inputs need only two columns in memory instead of decoded klines
+    """
+    delta = int(get_intervals([candles_interval])[candles_interval])
+    first_open = int(start_time.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    close_time = first_open + delta * np.arange(1, size + 1, dtype=np.int64) - 1
+    # Exchange sends prices with 8 decimals
+    close_price = np.round(generate_close_prices(size, seed=seed), 8)
+    return pd.DataFrame({"close_time": pd.to_datetime(close_time, utc=True, unit="ms"), "close_price": close_price})
+
+
+def bench_decode(size: int, candles_interval: str, repeat: int) -> dict:
+    """Decoding of response of exchange in BinanceAPIClient.get_klines"""
+    client = BinanceAPIClient(base_asset="BTC", quote_asset="USDT", mode="prod")
+    session = OfflineSession(json.dumps(generate_klines(size, candles_interval=candles_interval)))
+    return measure(lambda: client.get_klines(client.pair, candles_interval=candles_interval, depth=size,
+                                             session=session), repeat)
+
+
+def bench_to_pandas(size: int, candles_interval: str, repeat: int) -> dict:
+    client = make_client(size, candles_interval)
+    return measure(client.candlesticks_to_pandas, repeat)
+
+
+def bench_compute(steps: int, candles_interval: str, repeat: int, short_term=20, long_term=50) -> dict:
+    """Time of SMAStrategy.compute per candle in the same form as in run_strategy"""
+    client = make_client(long_term + steps, candles_interval)
+    candles = SMAStrategy.candle_preprocessing(client.candlesticks_to_pandas())
+
+    def run():
+        strategy = SMAStrategy(short_term=short_term, long_term=long_term, candle_interval=candles_interval)
+        price_data = strategy.compute_indicators(candles.loc[: long_term - 1].copy())
+        for i in range(long_term, long_term + steps):
+            price_data.loc[i, ["close_time", "close_price"]] = candles.loc[i, ["close_time", "close_price"]]
+            price_data = strategy.compute(price_data, step=i)
+
+    result = measure(run, repeat)
+    # Timings per one candle
+    result.update({key: result[key] / steps for key in ["min", "median", "mean"]})
+    return result
+
+
+def bench_backtest(size: int, candles_interval: str, repeat: int, report_dir: str,
+                   short_term=20, long_term=50) -> dict:
+    candles = make_candles(size, candles_interval)
+
+    def run():
+        strategy = SMAStrategy(short_term=short_term, long_term=long_term, candle_interval=candles_interval)
+        back_tester = SyntheticBackTester(strategy=strategy, candles=candles, report_dir=report_dir)
+        back_tester.run_backtesting(start_day=None, end_day=None)
+
+    return measure(run, repeat)
+
+
+def bench_report(size: int, candles_interval: str, repeat: int, report_dir: str) -> dict:
+    candles = make_candles(size, candles_interval)
+    strategy = SMAStrategy(candle_interval=candles_interval)
+    back_tester = SyntheticBackTester(strategy=strategy, candles=candles, report_dir=report_dir, write_report=True)
+    price_data = strategy.compute_indicators(candles.copy())
+    price_data[back_tester.assets] = back_tester.assets_amount
+    return measure(lambda: back_tester.form_report(price_data=price_data.copy(), file_name="benchmark_"), repeat)
+
+
+def compare(results: list, previous: list, threshold: float) -> list:
+    """
+    :return: list of benchmarks which became slower than threshold (as a fraction of previous median)
+    """
+    previous_medians = {(result["name"], result["size"]): result["median"] for result in previous}
+    regressions = []
+    print(f"{'benchmark':<28}{'size':>10}{'previous, s':>16}{'now, s':>16}{'ratio':>10}")
+    for result in results:
+        key = (result["name"], result["size"])
+        if key not in previous_medians:
+            continue
+        ratio = result["median"] / previous_medians[key]
+        mark = ""
+        if ratio > 1 + threshold:
+            regressions.append(result)
+            mark = "  REGRESSION"
+        print(f"{key[0]:<28}{key[1]:>10}{previous_medians[key]:>16.6f}{result['median']:>16.6f}{ratio:>10.2f}{mark}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks on synthetic candles")
+    # Backtest takes about 1 ms per candle, so 1_000_000 candles (about 15 minutes a run) is only on request
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="amounts of candles for run_backtesting")
+    parser.add_argument("--size", type=int, default=100_000, help="amount of candles for decode and pandas")
+    parser.add_argument("--report-size", type=int, default=10_000, help="amount of candles for report writing")
+    parser.add_argument("--steps", type=int, default=1000, help="amount of candles for per-candle compute")
+    parser.add_argument("--interval", default="5m", help="candle interval")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of fast benchmarks")
+    parser.add_argument("--backtest-repeat", type=int, default=3,
+                        help="runs of run_backtesting and form_report (median of one run is too noisy)")
+    parser.add_argument("--output", default=None, help="json file for results")
+    parser.add_argument("--compare", default=None, help="json file with previous results")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, fraction of median")
+    args = parser.parse_args(argv)
+
+    results = []
+
+    def add(name: str, size: int, result: dict):
+        result.update({"name": name, "size": size})
+        results.append(result)
+        print(f"{name:<28}{size:>10}  median {result['median']:.6f} s")
+
+    with tempfile.TemporaryDirectory() as report_dir:
+        report_dir += "/"
+        add("get_klines", args.size, bench_decode(args.size, args.interval, args.repeat))
+        add("candlesticks_to_pandas", args.size, bench_to_pandas(args.size, args.interval, args.repeat))
+        add("sma_compute_per_candle", args.steps, bench_compute(args.steps, args.interval, args.repeat))
+        for size in args.sizes:
+            add("run_backtesting", size, bench_backtest(size, args.interval, args.backtest_repeat, report_dir))
+        add("form_report", args.report_size,
+            bench_report(args.report_size, args.interval, args.backtest_repeat, report_dir))
+
+    output = args.output
+    if output is None:
+        results_dir = str(pathlib.PureWindowsPath(__file__).parent.as_posix()) + "/results/"
+        os.makedirs(results_dir, exist_ok=True)
+        output = results_dir + "benchmark_" + datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
+    environment = {"python": platform.python_version(), "platform": platform.platform(),
+                   "numpy": np.__version__, "pandas": pd.__version__,
+                   "date": datetime.now().isoformat(timespec="seconds")}
+    with open(output, "w") as f:
+        json.dump({"environment": environment, "results": results}, f, indent=2)
+    print("Results saved to ", output)
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            previous = json.load(f)["results"]
+        if compare(results, previous, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
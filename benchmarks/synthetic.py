@@ -0,0 +1,61 @@
+import numpy as np
+from datetime import datetime, timezone
+from exchange.utils import get_intervals
+
+
+def generate_close_prices(number_of_candles: int, model="gbm", start_price=100.0,
+                          drift=0.0, volatility=0.002, seed=0) -> np.ndarray:
+    """Deterministic synthetic close prices
+
+    :param number_of_candles: length of price path
+    :param model: "gbm" -- geometric brownian motion; "random_walk" -- arithmetic random walk
+    :param start_price: first price
+    :param drift: mean return of one candle
+    :param volatility: standard deviation of return of one candle
+    :param seed: seed of random generator (same seed -- same prices)
+    :return: array of close prices
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(size=number_of_candles)
+    if model == "gbm":
+        log_returns = (drift - volatility ** 2 / 2) + volatility * shocks
+        log_returns[0] = 0.0
+        return start_price * np.exp(np.cumsum(log_returns))
+    if model == "random_walk":
+        steps = start_price * (drift + volatility * shocks)
+        steps[0] = 0.0
+        # Prices of random walk can't go lower than 1% of start price
+        return np.maximum(start_price + np.cumsum(steps), start_price * 0.01)
+    raise Exception("model must be 'gbm' or 'random_walk'")
+
+
+def generate_klines(number_of_candles: int, candles_interval="5m", model="gbm",
+                    start_time=datetime(2021, 1, 1), seed=0, **kwargs) -> list:
+    """Deterministic synthetic candles in the same form as 'api/v3/klines' returns them
+    (prices and volumes are strings, times are ms timestamps, last 'Ignore' field included)
+
+    :param number_of_candles: amount of candles
+    :param candles_interval: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M
+    :param model: "gbm" or "random_walk" (see generate_close_prices)
+    :param start_time: open time of the first candle
+    :param seed: seed of random generator
+    :param kwargs: other parameters of generate_close_prices
+    :return: list of candles
+    """
+    rng = np.random.default_rng(seed + 1)
+    close = generate_close_prices(number_of_candles, model=model, seed=seed, **kwargs)
+    open_ = np.concatenate([close[:1], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(scale=0.001, size=number_of_candles)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(scale=0.001, size=number_of_candles)))
+    volume = rng.gamma(shape=2.0, scale=50.0, size=number_of_candles)
+    taker_volume = volume * rng.uniform(0.3, 0.7, size=number_of_candles)
+    trades = rng.poisson(lam=200, size=number_of_candles)
+    delta = int(get_intervals([candles_interval])[candles_interval])
+    first_open = int(start_time.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    open_time = first_open + delta * np.arange(number_of_candles, dtype=np.int64)
+    candles = []
+    for i in range(number_of_candles):
+        candles.append([int(open_time[i]), f"{open_[i]:.8f}", f"{high[i]:.8f}", f"{low[i]:.8f}", f"{close[i]:.8f}",
+                        f"{volume[i]:.8f}", int(open_time[i] + delta - 1), f"{volume[i] * close[i]:.8f}",
+                        int(trades[i]), f"{taker_volume[i]:.8f}", f"{taker_volume[i] * close[i]:.8f}", "0"])
+    return candles
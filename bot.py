@@ -2,8 +2,10 @@ from datetime import datetime
 from strategies.start_strategy import StartStrategy
 from strategies.sma_strategy import SMAStrategy
 from exchange.binanceclient import BinanceAPIClient
+from backtester.result_cache import ResultCache
+from screener.screener import Screener
 
-list_of_commands = ["help", "quit", "live", "test", "back_test"]
+list_of_commands = ["help", "quit", "live", "test", "back_test", "screener"]
 
 
 def bot_help():
@@ -14,9 +16,15 @@ def bot_help():
     print("     live        start real trading")
     print("     test        start live trading on binance spot testnet")
     print("     back_test   start backtester")
+    print("     screener    find pairs where simple moving averages just crossed")
+    print("")
+    print("Options of live, test and back_test commands:")
+    print("     --profile              save CPU profile and its summary to back_test_files")
+    print("     --profile-memory       trace allocations too")
+    print("     --profile-window=N     profile only first N candles of live trading")
 
 
-def back_test_start():
+def back_test_start(profile_options: dict):
     print("***** Start backtesting! *****")
     base_asset = input("Please enter base asset (for example 'USD'): ").upper()
     print("available candle intervals: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M\n"
@@ -40,12 +48,31 @@ def back_test_start():
     back_test = StartStrategy(strategy=strategy, mode="BACK_TEST")
     back_test.set_backtester_settings(start_day=start_date, end_day=end_date,
                                       base_asset=base_asset, quote_asset="USDT",
-                                      quote_asset_amount=quote_asset_amount)
-    back_test.start()
+                                      quote_asset_amount=quote_asset_amount, cache=ResultCache())
+    back_test.start(**profile_options)
     print("Back test executed!")
 
 
-def test_trading_start():
+def screener_start():
+    print("***** Start screener! *****")
+    quote_asset = input("Please enter quote asset of pairs (for example 'USDT', empty -- all pairs): ").upper()
+    print("available candle intervals: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M\n"
+          "m -> minutes; h -> hours; d -> days; w -> weeks; M -> months")
+    candle_interval = input("Please enter candle interval: ")
+    short_term, long_term = input("Please enter short and long terms for moving average "
+                                  "in form 'short_term long_term': ").split(" ")
+    screener = Screener()
+    pairs = screener.get_pairs(quote_asset=quote_asset or None)
+    print("Scanning", len(pairs), "pairs...")
+    result = screener.scan(pairs, candles_interval=candle_interval,
+                           short_term=int(short_term), long_term=int(long_term))
+    if result.empty:
+        print("No crossovers on the last candle")
+    else:
+        print(result.to_string())
+
+
+def test_trading_start(profile_options: dict):
     print("***** Trading on spot testnet will be executed! *****")
     while True:
         confirm = input("Do you want to continue and start real trading? [y/n]: ").lower()
@@ -54,14 +81,14 @@ def test_trading_start():
             client = initialize_client(mode)
             strategy = initialize_strategy()
             bot_interface = StartStrategy(client=client, strategy=strategy, mode="TEST")
-            bot_interface.start()
+            bot_interface.start(**profile_options)
         elif confirm == "n":
             main()
         else:
             print("Try to print 'y' or 'n'")
 
 
-def trading_start():
+def trading_start(profile_options: dict):
     print("***** Caution! Real trading will be executed! *****")
     while True:
         confirm = input("Do you want to continue and start real trading? [y/n]: ").lower()
@@ -70,7 +97,7 @@ def trading_start():
             client = initialize_client(mode)
             strategy = initialize_strategy()
             bot_interface = StartStrategy(client=client, strategy=strategy, mode="LIVE")
-            bot_interface.start()
+            bot_interface.start(**profile_options)
         elif confirm == "n":
             main()
         else:
@@ -111,29 +138,54 @@ def initialize_client(mode="test") -> BinanceAPIClient:
                             api_key=api_key, secret_key=secret_key, mode=mode)
 
 
-def command_handler(command: str):
+def parse_profile_options(options: list) -> dict:
+    """
+    :param options: words after command
+    :return: profiling arguments of StartStrategy.start
+    """
+    profile_options = {}
+    for option in options:
+        if option == "--profile":
+            profile_options["profile"] = True
+        elif option == "--profile-memory":
+            profile_options["profile"] = True
+            profile_options["profile_memory"] = True
+        elif option.startswith("--profile-window="):
+            profile_options["profile"] = True
+            profile_options["profile_window"] = int(option.split("=")[1])
+        else:
+            raise Exception("Unknown option " + option)
+    return profile_options
+
+
+def command_handler(command: str, options: list = None):
+    profile_options = parse_profile_options(options or [])
     if command == "quit":
         return False
     elif command == "help":
         bot_help()
         return True
     elif command == "live":
-        trading_start()
+        trading_start(profile_options)
         return True
     elif command == "test":
-        test_trading_start()
+        test_trading_start(profile_options)
         return True
     elif command == "back_test":
-        back_test_start()
+        back_test_start(profile_options)
+        return True
+    elif command == "screener":
+        screener_start()
         return True
 
 
 def main():
     bot_run = True
     while bot_run:
-        command = input("crypt_bot> ").lower()
+        command, *options = input("crypt_bot> ").split() or [""]
+        command = command.lower()
         if command in list_of_commands:
-            bot_run = command_handler(command)
+            bot_run = command_handler(command, options)
         else:
             print("Wrong command. Try 'help' command for information")
 
@@ -3,10 +3,10 @@ import hmac
 import json
 import hashlib
 import requests
-import pathlib
 import numpy as np
 import pandas as pd
-from exchange.utils import get_intervals
+from exchange.utils import get_intervals, get_all_pairs
+from exchange.weight_limiter import WeightLimiter, klines_weight
 from datetime import datetime, timezone
 from websocket import create_connection, WebSocketConnectionClosedException
 
@@ -37,6 +37,7 @@ class BinanceAPIClient(Exception):
         self._check_pair()
         self._http = None
         self._wss = None
+        self.limiter: WeightLimiter = None  # if set, requests wait for weight in this limiter (it can be shared)
         self.set_mode(mode=mode)
 
     def __next__(self):
@@ -80,6 +81,7 @@ class BinanceAPIClient(Exception):
         """
         :return: Pandas dataframe of wallet for gived account
         """
+        self._acquire(10)
         headers = {"X-MBX-APIKEY": self.api}
         params = {"recvWindow": recv_window, "timestamp": (self.get_now_timestamp())}
         total_params = "&".join([key + "=" + str(value) for key, value in params.items()])
@@ -94,7 +96,7 @@ class BinanceAPIClient(Exception):
 
     def new_order(self, side: str, order_type="MARKET", time_in_force="GTC",
                   quantity=None, quote_order_qty=None, price=None,
-                  stop_price=None, recv_window=5000):
+                  stop_price=None, recv_window=5000, new_client_order_id=None, timeout=None):
         """Create new order of 'order_type'
 
         :param side: str: "BUY" or "SELL"
@@ -114,7 +116,11 @@ class BinanceAPIClient(Exception):
                                 On the SELL side, the order will sell as much BTC needed to receive quoteOrderQty USDT.
         :param recv_window: int: max -- 60_000 With recv_window, you can specify that the request must be processed
                                  within a certain number of milliseconds or be rejected by the server.
+        :param new_client_order_id: str or None: unique id of order set by client; order with the same id
+                                    is not created twice while it is open
+        :param timeout: float or None: seconds to wait for response of the server
         """
+        self._acquire(1)
         headers = {"X-MBX-APIKEY": self.api}
         params = {"symbol": self.pair, "side": side, "type": order_type}
         if order_type in ["LIMIT", "STOP_LOSS_LIMIT", "TAKE_PROFIT_LIMIT"]:
@@ -127,11 +133,16 @@ class BinanceAPIClient(Exception):
             params["price"] = price
         if order_type in ["STOP_LOSS", "STOP_LOSS_LIMIT", "TAKE_PROFIT", "TAKE_PROFIT_LIMIT"]:
             params["stopPrice"] = stop_price
+        if new_client_order_id is not None:
+            params["newClientOrderId"] = new_client_order_id
         params["recvWindow"] = recv_window
         params["timestamp"] = self.get_now_timestamp()
         total_params = "&".join([key + "=" + str(value) for key, value in params.items()])
         params["signature"] = self._get_signature(total_params)
-        resp = requests.post(self._http + "api/v3/order", headers=headers, params=params)
+        resp = requests.post(self._http + "api/v3/order", headers=headers, params=params, timeout=timeout)
+        if resp.status_code >= 500:
+            # Error of the server: order could be created or not (requests.exceptions.HTTPError is raised)
+            resp.raise_for_status()
         return resp.json()
 
     def send_test_order(self, side: str, order_type="MARKET", time_in_force="GTC",
@@ -157,6 +168,7 @@ class BinanceAPIClient(Exception):
         :param recv_window: int: max -- 60_000 With recv_window, you can specify that the request must be processed
                                  within a certain number of milliseconds or be rejected by the server.
         """
+        self._acquire(1)
         headers = {"X-MBX-APIKEY": self.api}
         params = {"symbol": self.pair, "side": side, "type": order_type}
         if order_type in ["LIMIT", "STOP_LOSS_LIMIT", "TAKE_PROFIT_LIMIT"]:
@@ -177,45 +189,82 @@ class BinanceAPIClient(Exception):
         return resp.json()
 
     # Get order status with particular id
-    def get_order_status(self, order_id, recv_window=5000) -> dict:
+    def get_order_status(self, order_id=None, recv_window=5000, orig_client_order_id=None, timeout=None) -> dict:
         """
         :param order_id: int: Id of order
         :param recv_window: int: max -- 60_000 With recv_window, you can specify that the request must be processed
                                  within a certain number of milliseconds or be rejected by the server.
+        :param orig_client_order_id: str or None: id of order set by client (used if order_id is None)
+        :param timeout: float or None: seconds to wait for response of the server
         :return: information about order with Id 'order_id'
         """
+        self._acquire(2)
         headers = {"X-MBX-APIKEY": self.api}
-        params = {"symbol": self.pair,
-                  "orderId": order_id,
-                  "recvWindow": recv_window,
-                  "timestamp": self.get_now_timestamp()}
+        params = {"symbol": self.pair}
+        if order_id is not None:
+            params["orderId"] = order_id
+        else:
+            params["origClientOrderId"] = orig_client_order_id
+        params["recvWindow"] = recv_window
+        params["timestamp"] = self.get_now_timestamp()
         total_params = "&".join([key + "=" + str(value) for key, value in params.items()])
         params["signature"] = self._get_signature(total_params)
-        resp = requests.get(self._http + "api/v3/order", headers=headers, params=params)
+        resp = requests.get(self._http + "api/v3/order", headers=headers, params=params, timeout=timeout)
+        if resp.status_code >= 500:
+            resp.raise_for_status()
         return resp.json()
 
-    def get_all_order_status(self, start_time, end_time, recv_window=5000) -> list:
+    def get_all_order_status(self, start_time=None, end_time=None, recv_window=5000,
+                             symbol=None, order_id=None) -> list:
         """Get all account orders from start_time to end_time; active, canceled, or filled.
 
         :param start_time: timestamp in ms
         :param end_time: timestamp in ms
         :param recv_window: max -- 60_000 With recv_window, you can specify that the request must be processed
                             within a certain number of milliseconds or be rejected by the server.
+        :param symbol: str or None: pair of orders (pair of the client if None)
+        :param order_id: int or None: if set, orders with id >= order_id are returned
         :return: list of orders
         """
+        self._acquire(10)
         headers = {"X-MBX-APIKEY": self.api}
-        params = {"symbol": self.pair,
-                  "startTime": start_time,
-                  "endTime": end_time,
-                  "recvWindow": recv_window,
-                  "timestamp": self.get_now_timestamp()}
+        params = {"symbol": self.pair if symbol is None else symbol}
+        if order_id is not None:
+            params["orderId"] = order_id
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        params["recvWindow"] = recv_window
+        params["timestamp"] = self.get_now_timestamp()
         total_params = "&".join([key + "=" + str(value) for key, value in params.items()])
         params["signature"] = self._get_signature(total_params)
         resp = requests.get(self._http + "api/v3/allOrders", headers=headers, params=params)
         return resp.json()
 
+    def get_open_orders(self, symbol=None, recv_window=5000) -> list:
+        """Get all open orders of the account with one request.
+
+        :param symbol: str or None: pair of orders; if None open orders for all pairs are returned
+        :param recv_window: max -- 60_000 With recv_window, you can specify that the request must be processed
+                            within a certain number of milliseconds or be rejected by the server.
+        :return: list of orders
+        """
+        self._acquire(3 if symbol is not None else 40)
+        headers = {"X-MBX-APIKEY": self.api}
+        params = {}
+        if symbol is not None:
+            params["symbol"] = symbol
+        params["recvWindow"] = recv_window
+        params["timestamp"] = self.get_now_timestamp()
+        total_params = "&".join([key + "=" + str(value) for key, value in params.items()])
+        params["signature"] = self._get_signature(total_params)
+        resp = requests.get(self._http + "api/v3/openOrders", headers=headers, params=params)
+        return resp.json()
+
     # Cancel order with particular id
     def cancel_order(self, order_id, recv_window=5000):
+        self._acquire(1)
         headers = {"X-MBX-APIKEY": self.api}
         params = {"symbol": self.pair,
                   "orderId": order_id,
@@ -228,6 +277,7 @@ class BinanceAPIClient(Exception):
 
     # Cancel all orders
     def cancel_all_orders(self, recv_window=5000):
+        self._acquire(1)
         headers = {"X-MBX-APIKEY": self.api}
         params = {"symbol": self.pair,
                   "recvWindow": recv_window,
@@ -250,6 +300,23 @@ class BinanceAPIClient(Exception):
             raise Exception("Connection is failed!")
         return self.ws
 
+    # Start one websocket connection with candlestick streams of many pairs
+    def start_candle_streams(self, streams: list, stream_id=1):
+        """
+        :param streams: list of (pair, candles_interval)
+        :param stream_id: id of subscription
+        :return: websocket connection; its messages are candles of all streams
+        """
+        ws = create_connection(self._wss)
+        params = {"method": "SUBSCRIBE",
+                  "params": ["{symbol}@kline_{interval}".format(symbol=pair.lower(), interval=interval)
+                             for pair, interval in streams],
+                  "id": stream_id}
+        ws.send(json.dumps(params))
+        if json.loads(ws.recv())["result"] is not None:
+            raise Exception("Connection is failed!")
+        return ws
+
     # Stop websocket candlestik stream
     def stop_candle_stream(self):
         params = {"method": "UNSUBSCRIBE",
@@ -263,13 +330,8 @@ class BinanceAPIClient(Exception):
         return self.base + self.quote
 
     def _check_pair(self):
-        script_dir = str(pathlib.PureWindowsPath(__file__).parent.as_posix())
-        data = []
-        with open(script_dir + "/all_pairs.txt", "r") as f:
-            for line in f:
-                data.append(line.rstrip("\n"))
-            if self.pair not in data:
-                raise Exception("There is no pair " + self.pair + " in Binance exchange")
+        if self.pair not in get_all_pairs():
+            raise Exception("There is no pair " + self.pair + " in Binance exchange")
 
     def get_candlestick(self, candles_interval: str = "1m", depth=500) -> None:
         """
@@ -277,13 +339,28 @@ class BinanceAPIClient(Exception):
             1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M
         :param depth: max 1000
         """
+        self.candlestick = self.get_klines(symbol=self.pair, candles_interval=candles_interval, depth=depth)
+
+    def get_klines(self, symbol: str, candles_interval: str = "1m", depth=500, session=None) -> list:
+        """Get last candles of any pair without changing settings of the client
+
+        :param symbol: pair of candles
+        :param candles_interval: m -> minutes; h -> hours; d -> days; w -> weeks; M -> months
+            1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M
+        :param depth: max 1000
+        :param session: requests.Session for reusing connections (optional)
+        :return: list of candles (the last one is not closed)
+        """
         self._check_interval(candles_interval)
-        params = {"symbol": self.pair, "interval": candles_interval, "limit": depth}
-        resp = requests.get(self._http + "api/v3/klines", params=params).json()
+        params = {"symbol": symbol, "interval": candles_interval, "limit": depth}
+        self._acquire(klines_weight(depth))
+        resp = (session or requests).get(self._http + "api/v3/klines", params=params).json()
+        if not isinstance(resp, list):
+            raise Exception("Can't load candles of " + symbol + ": " + str(resp))
         # Here we drop 'Ignore' parameter from candles (last parameter in each list)
         for candle in resp:
             candle.pop()
-        self.candlestick = resp
+        return resp
 
     def get_candlestick_for_given_time(self, start_day: datetime,
                                        end_day: datetime, candles_interval: str = "1m"):
@@ -293,18 +370,20 @@ class BinanceAPIClient(Exception):
         end_date = end_day.replace(tzinfo=timezone.utc).timestamp() * 1000
         data = []
         while start_date < end_date:
-            if start_date + 1000 * delta < end_date:
-                params = {"symbol": self.pair, "startTime": int(start_date),
-                          "endTime": int(start_date + 1000 * delta), "interval": candles_interval, "limit": 1000}
-                start_date += 1000 * delta
-                resp = requests.get(self._http + "api/v3/klines", params=params)
-                data += resp.json()
-            else:
-                params = {"symbol": self.pair, "startTime": int(start_date),
-                          "endTime": int(end_date), "interval": candles_interval, "limit": 1000}
-                start_date += 1000 * delta
-                resp = requests.get(self._http + "api/v3/klines", params=params)
-                data += resp.json()
+            params = {"symbol": self.pair, "startTime": int(start_date),
+                      "endTime": int(min(start_date + 1000 * delta, end_date)),
+                      "interval": candles_interval, "limit": 1000}
+            start_date += 1000 * delta
+            self._acquire(klines_weight(1000))
+            resp = requests.get(self._http + "api/v3/klines", params=params)
+            try:
+                candles = resp.json()
+            except ValueError:
+                candles = resp.text
+            if not isinstance(candles, list):
+                # For example {"code": -1003, ...} with status 429 when limit of request weight is exceeded
+                raise Exception(f"Can't load candles of {self.pair} (status {resp.status_code}): {candles}")
+            data += candles
         for candle in data:
             candle.pop()
         self.candlestick = data
@@ -327,6 +406,11 @@ class BinanceAPIClient(Exception):
             csv_writer.writerow(self.__candle_headers)
             csv_writer.writerows(data_for_csv)
 
+    def _acquire(self, weight: int) -> None:
+        # Signed requests call it before timestamp is taken, so waiting in limiter does not expire recvWindow
+        if self.limiter is not None:
+            self.limiter.acquire(weight)
+
     def _get_signature(self, total_params):
         return hmac.new(self.secret.encode(), total_params.encode(), hashlib.sha256).hexdigest()
 
@@ -0,0 +1,339 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from exchange.binanceclient import BinanceAPIClient
+
+# Columns of candles in buffers (the same order as in 'api/v3/klines' response without 'Ignore')
+candle_headers = ["t", "o", "h", "l", "c", "v", "T", "q", "n", "V", "Q"]
+
+
+class CandleRingBuffer:
+    """Ring buffer of closed candles in shared memory (one writer, many readers).
+
+    Memory layout: header of int64 [count, capacity, amount of columns] and float64 array
+    of 2 * capacity rows. Every candle is written twice (in row i and in row i + capacity),
+    so the last n candles are always one contiguous block and readers get them without copying.
+    """
+    header_size = 3
+
+    def __init__(self, name: str, capacity=1000, create=False):
+        """
+        :param name: name of shared memory block
+        :param capacity: max amount of candles in buffer (used only if create=True)
+        :param create: True -- create a new block (writer side), False -- attach to existing block
+        """
+        columns = len(candle_headers)
+        size = 8 * (self.header_size + 2 * capacity * columns)
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = attach_shared_memory(name)
+        self._header = np.ndarray((self.header_size,), dtype=np.int64, buffer=self._shm.buf)
+        if create:
+            self._header[:] = [0, capacity, columns]
+        self.name = name
+        self.capacity = int(self._header[1])
+        self._data = np.ndarray((2 * self.capacity, int(self._header[2])), dtype=np.float64,
+                                buffer=self._shm.buf, offset=8 * self.header_size)
+
+    @property
+    def count(self) -> int:
+        """Amount of candles written since creation of buffer"""
+        return int(self._header[0])
+
+    def append(self, candle) -> None:
+        """
+        :param candle: values of candle_headers columns
+        """
+        position = self.count % self.capacity
+        self._data[position] = candle
+        self._data[position + self.capacity] = candle
+        # Counter is updated after data, so readers never see a half-written candle
+        self._header[0] += 1
+
+    def extend(self, candles) -> None:
+        for candle in candles:
+            self.append(candle)
+
+    def last(self, n: int, count: int = None) -> np.ndarray:
+        """View (without copy) of the last n candles
+
+        :param n: amount of candles (no more than capacity)
+        :param count: value of 'count' for which view is taken (current value if None)
+        :return: array n x len(candle_headers); view stays valid until capacity - n new candles are written
+        """
+        count = self.count if count is None else count
+        n = min(n, count, self.capacity)
+        end = count % self.capacity + self.capacity
+        return self._data[end - n: end]
+
+    def since(self, count: int) -> np.ndarray:
+        """View of candles written after the moment when buffer had 'count' candles"""
+        return self.last(self.count - count)
+
+    def close(self) -> None:
+        self._header = None
+        self._data = None
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+
+class CandleReader:
+    """Reader side of one buffer: waits for new candles and gives them to a strategy process"""
+
+    def __init__(self, name: str, condition, heartbeat=None, feeder_timeout=120.0):
+        """
+        :param name: name of shared memory block
+        :param condition: multiprocessing.Condition which is notified by feeder on every new candle
+        :param heartbeat: multiprocessing.Value with time.time() of the last sign of life of feeder (0 -- stopped)
+        :param feeder_timeout: seconds without sign of life after which feeder is considered dead
+        """
+        self.buffer = CandleRingBuffer(name)
+        self._condition = condition
+        self._heartbeat = heartbeat
+        self.feeder_timeout = feeder_timeout
+        self._read_count = self.buffer.count
+        self._running = True
+
+    def wait(self, timeout=None) -> bool:
+        """Wait for candles which were not read yet
+
+        :return: True if there are new candles, False if timeout has passed
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.buffer.count > self._read_count, timeout)
+
+    def read_new(self) -> np.ndarray:
+        """
+        :return: view of candles which were not read yet
+        """
+        count = self.buffer.count
+        self._check_overwritten(count)
+        candles = self.buffer.last(count - self._read_count, count=count)
+        self._read_count = count
+        return candles
+
+    def stop(self) -> None:
+        """Stop iteration over new candles"""
+        self._running = False
+
+    def history(self, n: int) -> pd.DataFrame:
+        """Last n candles in the same form as BinanceAPIClient.candlesticks_to_pandas.
+        These candles are marked as read, so iteration continues with candles written after them
+        """
+        count = self.buffer.count
+        self._read_count = count
+        return candles_to_pandas(self.buffer.last(n, count=count))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> pd.DataFrame:
+        """New candle in the same form as BinanceAPIClient gives in its stream, so reader can replace client
+        in loops like 'for candle in client'
+        """
+        while self._running and self.buffer.count <= self._read_count:
+            if not self.wait(timeout=1.0):
+                self._check_feeder()
+        if not self._running:
+            raise StopIteration
+        self._check_overwritten(self.buffer.count)
+        self._read_count += 1
+        return candles_to_pandas(self.buffer.last(1, count=self._read_count))
+
+    def _check_overwritten(self, count: int) -> None:
+        """Raise exception if candles which were not read yet are overwritten by new ones"""
+        if count - self._read_count > self.buffer.capacity:
+            raise Exception(f"Reader of {self.buffer.name} is {count - self._read_count} candles behind, "
+                            f"candles older than the last {self.buffer.capacity} are overwritten")
+
+    def _check_feeder(self) -> None:
+        """Raise exception if feeder stopped or gives no sign of life"""
+        if self._heartbeat is None:
+            return
+        heartbeat = self._heartbeat.value
+        if heartbeat == 0 or time.time() - heartbeat > self.feeder_timeout:
+            raise Exception(f"Feeder of market data bus is not running, no new candles for {self.buffer.name}")
+
+
+class MarketDataBus:
+    """One feeder process owns connection to exchange and writes candles into shared memory buffers,
+    one buffer per (pair, interval). Strategy processes read buffers without copying or pickling.
+
+    Example:
+        bus = MarketDataBus([("BTCUSDT", "5m"), ("ETHUSDT", "5m")])
+        bus.start()                                # returns when history of all pairs is in buffers
+        bus.start_worker(my_strategy, "BTCUSDT")   # my_strategy(connection, "BTCUSDT") in a new process
+        ...
+        bus.stop()
+    where my_strategy uses connection.reader("BTCUSDT", "5m").
+    """
+
+    def __init__(self, streams: list, capacity=1000, mode="prod", prefix="cryptbot"):
+        """
+        :param streams: list of (pair, candles_interval)
+        :param capacity: max amount of candles in every buffer
+        :param mode: "prod" or "test" -- mode of client of feeder
+        :param prefix: prefix of names of shared memory blocks
+        """
+        self.streams = [(pair.upper(), interval) for pair, interval in streams]
+        self.capacity = capacity
+        self.mode = mode
+        self.names = {stream: f"{prefix}_{stream[0]}_{stream[1]}" for stream in self.streams}
+        self._context = multiprocessing.get_context()
+        self._buffers = []
+        self._condition = None
+        self._ready = None
+        self._heartbeat = None
+        self._feeder = None
+        self._workers = []
+
+    def start(self) -> None:
+        """Create buffers, start feeder process and wait until it loads history"""
+        self._buffers = [CandleRingBuffer(name, capacity=self.capacity, create=True) for name in self.names.values()]
+        self._condition = self._context.Condition()
+        self._ready = self._context.Event()
+        self._heartbeat = self._context.Value("d", time.time())
+        self._feeder = self._context.Process(target=run_feeder, daemon=True,
+                                             args=(self.streams, self.names, self._condition, self.mode, self._ready,
+                                                   self._heartbeat))
+        self._feeder.start()
+        self.wait_ready()
+
+    def wait_ready(self) -> None:
+        """Wait until feeder writes history into all buffers"""
+        while not self._ready.wait(timeout=1.0):
+            if not self._feeder.is_alive():
+                raise Exception("Feeder of market data bus stopped before history was loaded")
+
+    def connection(self):
+        """
+        :return: picklable object for worker processes
+        """
+        self.wait_ready()
+        return BusConnection(self.names, self._condition, self._heartbeat)
+
+    @property
+    def feeder_alive(self) -> bool:
+        return self._feeder is not None and self._feeder.is_alive()
+
+    def start_worker(self, target, *args):
+        """Start process target(connection, *args)"""
+        worker = self._context.Process(target=target, args=(self.connection(), *args), daemon=True)
+        worker.start()
+        self._workers.append(worker)
+        return worker
+
+    def stop(self) -> None:
+        for process in self._workers + [self._feeder]:
+            if process is not None and process.is_alive():
+                process.terminate()
+                process.join()
+        self._workers = []
+        self._feeder = None
+        for buffer in self._buffers:
+            buffer.close()
+            buffer.unlink()
+        self._buffers = []
+
+
+class BusConnection:
+    """Names of buffers and condition of the bus; it is passed to worker processes"""
+
+    def __init__(self, names: dict, condition, heartbeat=None):
+        self.names = names
+        self.condition = condition
+        self.heartbeat = heartbeat
+
+    def reader(self, pair: str, candles_interval: str) -> CandleReader:
+        return CandleReader(self.names[(pair.upper(), candles_interval)], self.condition, heartbeat=self.heartbeat)
+
+
+def run_feeder(streams: list, names: dict, condition, mode="prod", ready=None, heartbeat=None,
+               max_reconnect_delay=60.0) -> None:
+    """Feeder process: writes closed candles of websocket streams into buffers.
+    After every connection (the first one and reconnections after any error, with growing delay)
+    candles which are missing in buffers are loaded with requests, so there are no gaps in buffers
+
+    :param ready: multiprocessing.Event which is set when history of all streams is written
+    :param heartbeat: multiprocessing.Value which gets time.time() on every message (0 when feeder stops)
+    :param max_reconnect_delay: max seconds between attempts to reconnect
+    """
+    client = BinanceAPIClient(base_asset="BTC", quote_asset="USDT", mode=mode)
+    buffers = {stream: CandleRingBuffer(name) for stream, name in names.items()}
+    try:
+        stream_id = 1
+        ws = None
+        delay = 1.0
+        while True:
+            if heartbeat is not None:
+                heartbeat.value = time.time()
+            try:
+                if ws is None:
+                    ws = client.start_candle_streams(streams, stream_id=stream_id)
+                    # History and candles which were closed while there was no connection
+                    # (messages of stream wait in socket, candles which are already in buffers are skipped)
+                    for (pair, interval), buffer in buffers.items():
+                        load_missing_candles(client, pair, interval, buffer)
+                    if ready is not None:
+                        ready.set()
+                    with condition:
+                        condition.notify_all()
+                    delay = 1.0
+                message = json.loads(ws.recv())
+            except Exception as e:
+                print("Error in feeder of market data bus: ", e)
+                ws = None
+                stream_id += 1
+                time.sleep(delay)
+                delay = min(delay * 2, max_reconnect_delay)
+                continue
+            candle = message.get("k")
+            if candle is None or not candle["x"]:
+                continue
+            buffer = buffers.get((message["s"], candle["i"]))
+            if buffer is not None and (buffer.count == 0 or float(candle["T"]) > buffer.last(1)[0][6]):
+                buffer.append([float(candle[key]) for key in candle_headers])
+                with condition:
+                    condition.notify_all()
+    finally:
+        if heartbeat is not None:
+            heartbeat.value = 0.0
+
+
+def load_missing_candles(client: BinanceAPIClient, pair: str, interval: str, buffer: CandleRingBuffer) -> None:
+    """Write into buffer closed candles which are newer than its last candle (all history if buffer is empty)"""
+    last_close = buffer.last(1)[0][6] if buffer.count else 0
+    # The last candle of history is not closed
+    history = client.get_klines(pair, candles_interval=interval, depth=min(buffer.capacity, 1000) + 1)[:-1]
+    buffer.extend([[float(value) for value in candle] for candle in history if candle[6] > last_close])
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to existing shared memory block without registering it in resource tracker of this process
+    (the block belongs to its creator, resource tracker would delete it when this process exits)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no 'track' argument
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def candles_to_pandas(candles: np.ndarray) -> pd.DataFrame:
+    """Candles from buffer in the same form as BinanceAPIClient.candlesticks_to_pandas"""
+    candlestick_df = pd.DataFrame(candles, columns=candle_headers)
+    candlestick_df["n"] = candlestick_df["n"].astype(np.int64)
+    candlestick_df["t"] = pd.to_datetime(candlestick_df["t"].astype(np.int64), utc=True, unit="ms")
+    candlestick_df["T"] = pd.to_datetime(candlestick_df["T"].astype(np.int64), utc=True, unit="ms")
+    return candlestick_df.sort_index(axis=1)
@@ -0,0 +1,179 @@
+import time
+import hashlib
+import statistics
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from exchange.binanceclient import BinanceAPIClient
+
+
+class OrderHandle:
+    """Handle of order which is being submitted in background"""
+
+    def __init__(self, client_order_id: str, side: str):
+        self.client_order_id = client_order_id
+        self.side = side
+        self.submitted_at = time.perf_counter()
+        self.acked_at = None
+        self.attempts = 0
+        self.future = None
+
+    @property
+    def latency(self):
+        """Seconds from submission to acknowledgement of exchange (None if order is not acknowledged yet)"""
+        if self.acked_at is None:
+            return None
+        return self.acked_at - self.submitted_at
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout=None) -> dict:
+        """
+        :return: response of exchange; raises exception if order was rejected or all attempts failed
+        """
+        return self.future.result(timeout=timeout)
+
+    def add_done_callback(self, callback) -> None:
+        """
+        :param callback: function(handle) called when order is acknowledged or failed
+        """
+        self.future.add_done_callback(lambda future: callback(self))
+
+
+class OrderExecutor:
+    """Submits orders in background threads, so the candle loop never waits for exchange.
+
+    Every order has a deterministic newClientOrderId. If a request times out, fails with error of the server (5xx),
+    its response can't be decoded or exchange answers that status of the order is unknown,
+    executor first asks exchange about the order with this id
+    and sends it again only if exchange does not know it, so retries never create duplicate orders.
+    """
+    # Errors after which order could be created or not: -1001 disconnected, -1006 unexpected response,
+    # -1007 timeout waiting for response from backend server
+    unknown_status_codes = [-1001, -1006, -1007]
+
+    def __init__(self, workers=4, retries=3, timeout=10.0, retry_delay=0.5, recv_window=5000):
+        """
+        :param workers: amount of threads which send orders
+        :param retries: max amount of repeated attempts to send an order
+        :param timeout: seconds to wait for response of the server
+        :param retry_delay: seconds before the first retry (doubles after every attempt)
+        :param recv_window: parameter of requests
+        """
+        self.retries = retries
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.recv_window = recv_window
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="order_executor")
+        self._in_flight = {}
+        self._latencies = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_client_order_id(*parts) -> str:
+        """Deterministic id of order: the same parts (for example strategy, pair, side and candle time)
+        always give the same id (Binance allows up to 36 symbols)
+        """
+        return "cb_" + hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+    def submit(self, client: BinanceAPIClient, side: str, client_order_id: str, **order_params) -> OrderHandle:
+        """Start submission of order and return immediately
+
+        :param client: client of the pair
+        :param side: "BUY" or "SELL"
+        :param client_order_id: id from make_client_order_id
+        :param order_params: other parameters of BinanceAPIClient.new_order
+        :return: handle of order
+        """
+        handle = OrderHandle(client_order_id=client_order_id, side=side)
+        with self._lock:
+            self._in_flight[client_order_id] = handle
+        handle.future = self._pool.submit(self._execute, client, handle, order_params)
+        return handle
+
+    @property
+    def in_flight(self) -> list:
+        """Handles of orders which are not acknowledged yet"""
+        with self._lock:
+            return list(self._in_flight.values())
+
+    def latency_stats(self) -> dict:
+        """
+        :return: statistics of submit-to-ack latency in seconds
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return {"count": 0}
+        return {"count": len(latencies),
+                "mean": statistics.mean(latencies),
+                "median": statistics.median(latencies),
+                "p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+                "max": latencies[-1]}
+
+    def shutdown(self, wait=True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _execute(self, client: BinanceAPIClient, handle: OrderHandle, order_params: dict) -> dict:
+        try:
+            response = self._send(client, handle, order_params)
+            handle.acked_at = time.perf_counter()
+            with self._lock:
+                self._latencies.append(handle.latency)
+            return response
+        finally:
+            with self._lock:
+                self._in_flight.pop(handle.client_order_id, None)
+
+    def _send(self, client: BinanceAPIClient, handle: OrderHandle, order_params: dict) -> dict:
+        delay = self.retry_delay
+        error = None
+        send = True
+        for attempt in range(self.retries + 1):
+            if send:
+                handle.attempts += 1
+                sent_at = time.monotonic()
+                try:
+                    response = client.new_order(side=handle.side, new_client_order_id=handle.client_order_id,
+                                                timeout=self.timeout, recv_window=self.recv_window, **order_params)
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    # Timeout, connection error, 5xx or body which is not json: status of the order is unknown
+                    response = None
+                    error = e
+                if response is not None:
+                    if "orderId" in response:
+                        return response
+                    error = Exception(f"Order {handle.client_order_id} is rejected: {response}")
+                    duplicate = "Duplicate" in str(response.get("msg", ""))
+                    if response.get("code") not in self.unknown_status_codes and not duplicate:
+                        raise error
+            # Status of the order is unknown: check if exchange has it before sending it again.
+            # If exchange did not answer, the order is not sent again (it could be created and filled already).
+            # Exchange rejects requests older than recv_window, so after it passes
+            # "order does not exist" means that the previous request will never create the order
+            order, known = self._find_order(client, handle.client_order_id)
+            if order is not None:
+                return order
+            if attempt < self.retries:
+                if known:
+                    time.sleep(max(delay, sent_at + self.recv_window / 1000 - time.monotonic()))
+                else:
+                    time.sleep(delay)
+                send = known
+                delay *= 2
+        raise Exception(f"Order {handle.client_order_id} is not sent after {handle.attempts} attempts: {error}")
+
+    def _find_order(self, client: BinanceAPIClient, client_order_id: str) -> tuple:
+        """
+        :return: order from exchange (or None) and True if exchange answered (False if status is still unknown)
+        """
+        try:
+            order = client.get_order_status(orig_client_order_id=client_order_id, recv_window=self.recv_window,
+                                            timeout=self.timeout)
+        except (requests.exceptions.RequestException, ValueError):
+            return None, False
+        if "orderId" in order:
+            return order, True
+        # -2013: order does not exist
+        return None, order.get("code") == -2013
@@ -1,4 +1,6 @@
+import pathlib
 from datetime import timedelta
+from functools import lru_cache
 
 
 def get_intervals(interval):
@@ -18,3 +20,11 @@ def get_intervals(interval):
             ms_time = timedelta(days=digit*30).total_seconds() * 1000
         ms_dict.update({key: ms_time})
     return ms_dict
+
+
+@lru_cache(maxsize=None)
+def get_all_pairs() -> tuple:
+    """Pairs from all_pairs.txt; file is read only once per process"""
+    script_dir = str(pathlib.PureWindowsPath(__file__).parent.as_posix())
+    with open(script_dir + "/all_pairs.txt", "r") as f:
+        return tuple(line.rstrip("\n") for line in f if line.strip())
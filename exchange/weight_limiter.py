@@ -0,0 +1,39 @@
+import time
+import threading
+
+
+class WeightLimiter:
+    """Keeps request weight of the last minute under the limit of exchange (thread safe).
+    One limiter can be shared by many clients (all of them use the same limit of IP address)
+    """
+
+    def __init__(self, weight_per_minute=1100):
+        """
+        :param weight_per_minute: allowed weight in a minute (Binance limit is 1200, some weight is left for trading)
+        """
+        self.weight_per_minute = weight_per_minute
+        self._requests = []  # (time, weight) of requests of the last minute
+        self._lock = threading.Lock()
+
+    def acquire(self, weight: int) -> None:
+        """Wait until request with this weight can be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._requests = [(t, w) for t, w in self._requests if now - t < 60]
+                if sum(w for _, w in self._requests) + weight <= self.weight_per_minute:
+                    self._requests.append((now, weight))
+                    return
+                wait = 60 - (now - self._requests[0][0])
+            time.sleep(wait)
+
+
+def klines_weight(limit: int) -> int:
+    """Weight of 'api/v3/klines' request with this limit"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
@@ -0,0 +1,345 @@
+import math
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class Indicator(ABC):
+    """Base class for indicators.
+
+    Every indicator has two forms which give the same numbers:
+    compute -- vectorized form, takes whole arrays (used in backtests and for history);
+    update -- incremental form, takes values of one new candle and works in O(1) (used in live trading).
+    """
+    inputs = ("close_price",)  # columns of price data which indicator needs
+
+    def __init__(self, window: int):
+        """
+        :param window: amount of candles which indicator uses
+        """
+        self.window = window
+
+    @property
+    @abstractmethod
+    def columns(self) -> list:
+        """Names of columns which indicator writes into price data"""
+
+    @abstractmethod
+    def compute(self, *arrays: np.ndarray) -> np.ndarray:
+        """
+        :param arrays: one array per column in 'inputs'
+        :return: array of shape (len(arrays[0]), len(columns)); NaN where indicator is not ready
+        """
+
+    @abstractmethod
+    def update(self, *values: float) -> tuple:
+        """
+        :param values: one value per column in 'inputs' for a new candle
+        :return: tuple of values for 'columns' on this candle; NaN where indicator is not ready
+        """
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Forget state of incremental form"""
+
+    def compute_df(self, price_data: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized form for dataframes
+
+        :param price_data: dataframe which contains 'inputs' columns
+        :return: price_data with indicator columns
+        """
+        arrays = [price_data[column].to_numpy(dtype=float) for column in self.inputs]
+        price_data[self.columns] = self.compute(*arrays)
+        return price_data
+
+    def update_df(self, price_data: pd.DataFrame, step: int) -> pd.DataFrame:
+        """Incremental form for dataframes
+
+        :param price_data: dataframe which contains 'inputs' columns
+        :param step: index of a new candle in price_data
+        :return: price_data with indicator columns filled on this step
+        """
+        values = [float(price_data.loc[step, column]) for column in self.inputs]
+        price_data.loc[step, self.columns] = self.update(*values)
+        return price_data
+
+
+class SMA(Indicator):
+    """Simple moving average"""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self._values = deque()
+        self._sum = 0.0
+
+    @property
+    def columns(self) -> list:
+        return [str(self.window) + "_SMA"]
+
+    def compute(self, close: np.ndarray) -> np.ndarray:
+        return rolling_mean(close, self.window).reshape(-1, 1)
+
+    def update(self, close: float) -> tuple:
+        self._values.append(close)
+        self._sum += close
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+        if len(self._values) < self.window:
+            return (np.nan,)
+        return (self._sum / self.window,)
+
+    def reset(self) -> None:
+        self._values.clear()
+        self._sum = 0.0
+
+
+class EMA(Indicator):
+    """Exponential moving average, alpha = 2 / (window + 1), starts from the first price"""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.alpha = 2 / (window + 1)
+        self._ema = None
+        self._count = 0
+
+    @property
+    def columns(self) -> list:
+        return [str(self.window) + "_EMA"]
+
+    def compute(self, close: np.ndarray) -> np.ndarray:
+        ema = _ewm(close, self.alpha)
+        ema[: self.window - 1] = np.nan
+        return ema.reshape(-1, 1)
+
+    def update(self, close: float) -> tuple:
+        self._count += 1
+        self._ema = close if self._ema is None else self._ema + self.alpha * (close - self._ema)
+        if self._count < self.window:
+            return (np.nan,)
+        return (self._ema,)
+
+    def reset(self) -> None:
+        self._ema = None
+        self._count = 0
+
+
+class RSI(Indicator):
+    """Relative strength index with Wilder's smoothing (alpha = 1 / window)"""
+
+    def __init__(self, window: int = 14):
+        super().__init__(window)
+        self.alpha = 1 / window
+        self._prev_close = None
+        self._avg_gain = None
+        self._avg_loss = None
+        self._count = 0
+
+    @property
+    def columns(self) -> list:
+        return [str(self.window) + "_RSI"]
+
+    def compute(self, close: np.ndarray) -> np.ndarray:
+        rsi = np.full(len(close), np.nan)
+        if len(close) > 1:
+            delta = np.diff(close)
+            avg_gain = _ewm(np.clip(delta, 0, None), self.alpha)
+            avg_loss = _ewm(np.clip(-delta, 0, None), self.alpha)
+            rsi[1:] = _rsi(avg_gain, avg_loss)
+            rsi[: self.window] = np.nan
+        return rsi.reshape(-1, 1)
+
+    def update(self, close: float) -> tuple:
+        if self._prev_close is None:
+            self._prev_close = close
+            return (np.nan,)
+        delta = close - self._prev_close
+        self._prev_close = close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        self._count += 1
+        if self._avg_gain is None:
+            self._avg_gain, self._avg_loss = gain, loss
+        else:
+            self._avg_gain += self.alpha * (gain - self._avg_gain)
+            self._avg_loss += self.alpha * (loss - self._avg_loss)
+        if self._count < self.window:
+            return (np.nan,)
+        return (float(_rsi(np.array([self._avg_gain]), np.array([self._avg_loss]))[0]),)
+
+    def reset(self) -> None:
+        self._prev_close = None
+        self._avg_gain = None
+        self._avg_loss = None
+        self._count = 0
+
+
+class BollingerBands(Indicator):
+    """Bollinger bands: SMA and SMA +/- width * standard deviation (population) of close prices"""
+
+    def __init__(self, window: int = 20, width: float = 2.0):
+        super().__init__(window)
+        self.width = width
+        self._values = deque()
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from mean (sums of squares lose precision at high prices)
+
+    @property
+    def columns(self) -> list:
+        prefix = str(self.window) + "_BB_"
+        return [prefix + "lower", prefix + "middle", prefix + "upper"]
+
+    def compute(self, close: np.ndarray) -> np.ndarray:
+        mean = _rolling_sum(close, self.window) / self.window
+        std = np.full(len(close), np.nan)
+        if len(close) >= self.window:
+            std[self.window - 1:] = sliding_window_view(close.astype(float), self.window).std(axis=1)
+        return np.column_stack([mean - self.width * std, mean, mean + self.width * std])
+
+    def update(self, close: float) -> tuple:
+        # Welford's algorithm with removal of the oldest value
+        self._values.append(close)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            mean = self._mean + (close - old) / self.window
+            self._m2 += (close - old) * (close - mean + old - self._mean)
+            self._mean = mean
+        else:
+            delta = close - self._mean
+            self._mean += delta / len(self._values)
+            self._m2 += delta * (close - self._mean)
+        if len(self._values) < self.window:
+            return np.nan, np.nan, np.nan
+        std = math.sqrt(max(self._m2 / self.window, 0.0))
+        return self._mean - self.width * std, self._mean, self._mean + self.width * std
+
+    def reset(self) -> None:
+        self._values.clear()
+        self._mean = 0.0
+        self._m2 = 0.0
+
+
+class ATR(Indicator):
+    """Average true range with Wilder's smoothing (alpha = 1 / window)"""
+    inputs = ("high_price", "low_price", "close_price")
+
+    def __init__(self, window: int = 14):
+        super().__init__(window)
+        self.alpha = 1 / window
+        self._prev_close = None
+        self._atr = None
+        self._count = 0
+
+    @property
+    def columns(self) -> list:
+        return [str(self.window) + "_ATR"]
+
+    def compute(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        true_range = high - low
+        if len(close) > 1:
+            prev_close = close[:-1]
+            true_range[1:] = np.maximum.reduce([true_range[1:],
+                                                np.abs(high[1:] - prev_close),
+                                                np.abs(low[1:] - prev_close)])
+        atr = _ewm(true_range, self.alpha)
+        atr[: self.window - 1] = np.nan
+        return atr.reshape(-1, 1)
+
+    def update(self, high: float, low: float, close: float) -> tuple:
+        true_range = high - low
+        if self._prev_close is not None:
+            true_range = max(true_range, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self._count += 1
+        self._atr = true_range if self._atr is None else self._atr + self.alpha * (true_range - self._atr)
+        if self._count < self.window:
+            return (np.nan,)
+        return (self._atr,)
+
+    def reset(self) -> None:
+        self._prev_close = None
+        self._atr = None
+        self._count = 0
+
+
+class VWAP(Indicator):
+    """Volume weighted average of typical price (high + low + close) / 3 over last 'window' candles"""
+    inputs = ("high_price", "low_price", "close_price", "volume")
+
+    def __init__(self, window: int = 20):
+        super().__init__(window)
+        self._values = deque()
+        self._sum_pv = 0.0
+        self._sum_v = 0.0
+
+    @property
+    def columns(self) -> list:
+        return [str(self.window) + "_VWAP"]
+
+    def compute(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        typical = (high + low + close) / 3
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = _rolling_sum(typical * volume, self.window) / _rolling_sum(volume, self.window)
+        return vwap.reshape(-1, 1)
+
+    def update(self, high: float, low: float, close: float, volume: float) -> tuple:
+        pv = (high + low + close) / 3 * volume
+        self._values.append((pv, volume))
+        self._sum_pv += pv
+        self._sum_v += volume
+        if len(self._values) > self.window:
+            old_pv, old_v = self._values.popleft()
+            self._sum_pv -= old_pv
+            self._sum_v -= old_v
+        if len(self._values) < self.window or self._sum_v == 0:
+            return (np.nan,)
+        return (self._sum_pv / self._sum_v,)
+
+    def reset(self) -> None:
+        self._values.clear()
+        self._sum_pv = 0.0
+        self._sum_v = 0.0
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average along the last axis (array of candles or array rows x candles);
+    NaN for first window - 1 candles and where window has missing (NaN) values.
+    The same code is used by SMA, by robustness and portfolio backtests and by the screener.
+    """
+    return _rolling_sum(values, window) / window
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of last 'window' values along the last axis; NaN for first window - 1 positions
+    and where window has missing (NaN) values
+    """
+    values = np.asarray(values, dtype=float)
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return result
+    missing = np.isnan(values)
+    has_missing = missing.any()
+    if has_missing:
+        values = np.where(missing, 0.0, values)
+    zeros = np.zeros(values.shape[:-1] + (1,))
+    cumsum = np.cumsum(np.concatenate([zeros, values], axis=-1), axis=-1)
+    result[..., window - 1:] = cumsum[..., window:] - cumsum[..., :-window]
+    if has_missing:
+        cumsum_missing = np.cumsum(np.concatenate([zeros, missing], axis=-1), axis=-1)
+        result[..., window - 1:][cumsum_missing[..., window:] - cumsum_missing[..., :-window] > 0] = np.nan
+    return result
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponential smoothing y[0] = x[0], y[i] = y[i-1] + alpha * (x[i] - y[i-1])"""
+    if len(values) == 0:
+        return np.array([], dtype=float)
+    return pd.Series(values, dtype=float).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+
+
+def _rsi(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    # If there were no losses RSI is 100 (or 50 if price did not move at all)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+    return rsi
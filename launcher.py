@@ -0,0 +1,253 @@
+"""Headless launcher: starts a fleet of bots described in a json config inside one supervisor process.
+
+Usage:
+    python launcher.py fleet.example.json
+    python launcher.py fleet.example.json --check   (validate config and exit)
+
+Config:
+    {
+      "defaults": {...},                      # values used by every bot if bot has no own value
+      "accounts": {"main": {"api_key_env": "BINANCE_API_KEY", "secret_key_env": "BINANCE_SECRET_KEY"}},
+      "bots": [
+        {"name": "btc_5m", "account": "main", "mode": "test", "base_asset": "BTC", "quote_asset": "USDT",
+         "strategy": {"short_term": 20, "long_term": 50, "trading_capital": 0.2, "losses": 0.8,
+                      "candle_interval": "5m"}},
+        {"name": "eth_bt", "mode": "back_test", "base_asset": "ETH", "quote_asset": "USDT",
+         "strategy": {...}, "back_test": {"start_day": "2021-01-01", "end_day": "2021-02-01",
+                                          "quote_asset_amount": 100.0, "cache": true},
+         "profile": {"profile": true}},
+        {"name": "usdt_portfolio", "mode": "portfolio", "base_assets": ["BTC", "ETH", "BNB"], "quote_asset": "USDT",
+         "strategy": {...}, "back_test": {"start_day": "2021-01-01", "end_day": "2022-01-01",
+                                          "quote_asset_amount": 1000.0}}
+      ]
+    }
+Modes: "live", "test", "back_test", "robustness", "portfolio" (one backtest of pairs of "base_assets" with shared
+quote asset). Keys of accounts are read from environment variables.
+"profile" of a bot takes arguments of StartStrategy.start (profile, profile_memory, profile_window, profile_top),
+profile files are prefixed with the name of the bot.
+Pandas, numpy and the client are imported only after the config is read.
+All bots share one limiter of request weight (the exchange limits weight per IP address), live and test bots
+are started one by one with --stagger seconds between them, so the fleet does not load history and open
+websockets at the same moment.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+
+start_time = time.perf_counter()
+
+modes = {"live": "LIVE", "test": "TEST", "back_test": "BACK_TEST", "robustness": "ROBUSTNESS",
+         "portfolio": "PORTFOLIO"}
+# Allowed keys of "back_test" settings (arguments of set_..._settings of StartStrategy)
+back_test_keys = {"BACK_TEST": ["start_day", "end_day", "base_asset_amount", "quote_asset_amount", "cache"],
+                  "ROBUSTNESS": ["start_day", "end_day", "quote_asset_amount", "paths", "block_size", "min_window",
+                                 "workers", "seed"],
+                  "PORTFOLIO": ["start_day", "end_day", "quote_asset_amount", "workers"]}
+
+
+def load_config(path: str) -> list:
+    """Read config and merge defaults into bots
+
+    :param path: path to json config
+    :return: list of bot definitions
+    """
+    with open(path, "r") as f:
+        config = json.load(f)
+    defaults = config.get("defaults", {})
+    accounts = config.get("accounts", {})
+    bots = []
+    for number, bot in enumerate(config["bots"]):
+        bot = {**defaults, **bot, "strategy": {**defaults.get("strategy", {}), **bot.get("strategy", {})}}
+        bot.setdefault("name", f"bot_{number}")
+        bot.setdefault("quote_asset", "USDT")
+        if bot.get("mode") not in modes:
+            raise Exception(f"Bot {bot['name']}: mode must be one of: " + ", ".join(modes))
+        if modes[bot["mode"]] == "PORTFOLIO":
+            if not bot.get("base_assets"):
+                raise Exception(f"Bot {bot['name']}: base_assets are required")
+        elif "base_asset" not in bot:
+            raise Exception(f"Bot {bot['name']}: base_asset is required")
+        if modes[bot["mode"]] in ["LIVE", "TEST"]:
+            if bot.get("account") not in accounts:
+                raise Exception(f"Bot {bot['name']}: account must be one of: " + ", ".join(accounts))
+            bot["account"] = {"name": bot["account"], **accounts[bot["account"]]}
+        elif "back_test" not in bot:
+            raise Exception(f"Bot {bot['name']}: back_test settings are required")
+        else:
+            unknown = [key for key in bot["back_test"] if key not in back_test_keys[modes[bot["mode"]]]]
+            if unknown:
+                raise Exception(f"Bot {bot['name']}: unknown back_test settings for mode {bot['mode']}: "
+                                + ", ".join(unknown))
+        bots.append(bot)
+    return bots
+
+
+class Supervisor:
+    """Runs every bot in its own thread and restarts bots which failed"""
+
+    def __init__(self, bots: list, restart_delay=5.0, max_restart_delay=300.0, max_restarts=None,
+                 weight_per_minute=1100, stagger=0.5):
+        """
+        :param bots: bot definitions from load_config
+        :param restart_delay: seconds before the first restart of a failed bot (doubles after every failure)
+        :param max_restart_delay: max seconds between restarts
+        :param max_restarts: max amount of restarts of a bot; None -- without limit
+        :param weight_per_minute: limit of request weight of all bots together
+        :param stagger: seconds between starts of live and test bots
+        """
+        self.bots = bots
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.max_restarts = max_restarts
+        self.weight_per_minute = weight_per_minute
+        self.stagger = stagger
+        self._limiter = None  # one limiter of request weight for all bots
+        self._threads = []
+        self._trackers = {}  # order tracker for every account
+        self._executor = None  # one order executor for all bots
+        self._lock = threading.Lock()
+        self._ready = {}  # name of bot -> seconds from process start to start of trading loop (or of backtest)
+
+    def start(self) -> None:
+        import_start = time.perf_counter()
+        # Heavy imports happen here, once, before threads start
+        import strategies.start_strategy
+        import exchange.order_tracker
+        from exchange.weight_limiter import WeightLimiter
+        print(f"Imports: {time.perf_counter() - import_start:.3f} s")
+        self._limiter = WeightLimiter(weight_per_minute=self.weight_per_minute)
+        live_bots = 0
+        for bot in self.bots:
+            delay = 0.0
+            if modes[bot["mode"]] in ["LIVE", "TEST"]:
+                delay = live_bots * self.stagger
+                live_bots += 1
+            thread = threading.Thread(target=self._supervise, args=(bot, delay), name=bot["name"], daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"{len(self._threads)} bots launched in {time.perf_counter() - start_time:.3f} s after start")
+
+    def wait(self) -> None:
+        try:
+            for thread in self._threads:
+                thread.join()
+        except KeyboardInterrupt:
+            print("Stopped by user")
+        finally:
+            for tracker in self._trackers.values():
+                tracker.stop()
+            if self._executor is not None:
+                print("Order latency: ", self._executor.latency_stats())
+                self._executor.shutdown()
+
+    def _supervise(self, bot: dict, start_delay=0.0) -> None:
+        time.sleep(start_delay)
+        restarts = 0
+        delay = self.restart_delay
+        while True:
+            try:
+                self._run_bot(bot)
+                return
+            except Exception as e:
+                print(f"Error in {bot['name']}: ", e)
+            restarts += 1
+            if self.max_restarts is not None and restarts > self.max_restarts:
+                print(f"{bot['name']} is stopped after {self.max_restarts} restarts")
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
+
+    def _run_bot(self, bot: dict) -> None:
+        from exchange.binanceclient import BinanceAPIClient
+        from strategies.sma_strategy import SMAStrategy
+        from strategies.start_strategy import StartStrategy
+        from backtester.result_cache import ResultCache
+        mode = modes[bot["mode"]]
+        if mode in ["LIVE", "TEST"]:
+            client_mode = "prod" if mode == "LIVE" else "test"
+            api_key = os.environ.get(bot["account"].get("api_key_env", ""), "")
+            secret_key = os.environ.get(bot["account"].get("secret_key_env", ""), "")
+            client = BinanceAPIClient(base_asset=bot["base_asset"].upper(), quote_asset=bot["quote_asset"].upper(),
+                                      api_key=api_key, secret_key=secret_key, mode=client_mode)
+            client.limiter = self._limiter
+            tracker = self._get_tracker(bot["account"]["name"] + "_" + client_mode, client)
+            strategy = SMAStrategy(client=client, order_tracker=tracker, order_executor=self._get_executor(),
+                                   **bot["strategy"])
+            # Live bot is ready when history is loaded and stream of candles is started
+            strategy.on_ready = lambda: self._mark_ready(bot["name"])
+            bot_interface = StartStrategy(client=client, strategy=strategy, mode=mode)
+        else:
+            strategy = SMAStrategy(**bot["strategy"])
+            bot_interface = StartStrategy(strategy=strategy, mode=mode)
+            settings = dict(bot["back_test"])
+            settings["start_day"] = datetime.fromisoformat(settings["start_day"])
+            settings["end_day"] = datetime.fromisoformat(settings["end_day"])
+            settings["limiter"] = self._limiter
+            if mode == "PORTFOLIO":
+                settings.update(base_assets=[base.upper() for base in bot["base_assets"]],
+                                quote_asset=bot["quote_asset"].upper())
+                bot_interface.set_portfolio_settings(**settings)
+            else:
+                settings.update(base_asset=bot["base_asset"].upper(), quote_asset=bot["quote_asset"].upper())
+                if mode == "BACK_TEST":
+                    settings["cache"] = ResultCache() if settings.pop("cache", False) else None
+                    bot_interface.set_backtester_settings(**settings)
+                else:
+                    bot_interface.set_robustness_settings(**settings)
+        if mode not in ["LIVE", "TEST"]:
+            self._mark_ready(bot["name"])
+        bot_interface.start(**{"profile_name": bot["name"], **bot.get("profile", {})})
+
+    def _mark_ready(self, name: str) -> None:
+        with self._lock:
+            if name in self._ready:
+                return
+            self._ready[name] = time.perf_counter() - start_time
+            print(f"{name} is ready in {self._ready[name]:.3f} s after start")
+            if len(self._ready) == len(self.bots):
+                print(f"All {len(self.bots)} bots are ready in {max(self._ready.values()):.3f} s after start")
+
+    def _get_tracker(self, account: str, client):
+        """One order tracker per account, so order statuses are loaded with batched requests"""
+        from exchange.order_tracker import OrderTracker
+        with self._lock:
+            if account not in self._trackers:
+                self._trackers[account] = OrderTracker(client=client)
+                self._trackers[account].start()
+            return self._trackers[account]
+
+    def _get_executor(self):
+        """Orders of all bots are sent in background threads of one order executor"""
+        from exchange.order_executor import OrderExecutor
+        with self._lock:
+            if self._executor is None:
+                self._executor = OrderExecutor()
+            return self._executor
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Start a fleet of bots from json config")
+    parser.add_argument("config", help="path to json config")
+    parser.add_argument("--check", action="store_true", help="only validate config")
+    parser.add_argument("--max-restarts", type=int, default=None, help="max restarts of a failed bot")
+    parser.add_argument("--weight-per-minute", type=int, default=1100,
+                        help="limit of request weight of all bots in a minute")
+    parser.add_argument("--stagger", type=float, default=0.5, help="seconds between starts of live and test bots")
+    args = parser.parse_args(argv)
+    bots = load_config(args.config)
+    print(f"Config: {len(bots)} bots, read in {time.perf_counter() - start_time:.3f} s")
+    if args.check:
+        return 0
+    supervisor = Supervisor(bots, max_restarts=args.max_restarts, weight_per_minute=args.weight_per_minute,
+                            stagger=args.stagger)
+    supervisor.start()
+    supervisor.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import io
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+
+class Profiler:
+    """Collects CPU profile (cProfile) and optionally allocation snapshot (tracemalloc)
+    and writes them to report directory with a short summary of top functions and allocation sites.
+
+    Files: <file_name>profile.prof -- profile for pstats/snakeviz, <file_name>profile.txt -- summary.
+
+    tracemalloc is global for the process, so profilers of many bots share it: tracing starts with the first
+    profiler with memory=True and stops with the last one (tracing started outside of Profiler is never stopped).
+    Allocation sites in summary are of the whole process.
+    """
+
+    _memory_lock = threading.Lock()
+    _memory_users = 0  # amount of running profilers which trace allocations
+    _owns_tracing = False  # True if tracing was started by Profiler
+
+    def __init__(self, file_name: str, report_dir: str, memory=False, window=None, top=20):
+        """
+        :param file_name: prefix of report files
+        :param report_dir: directory for report files
+        :param memory: if True, allocations are traced with tracemalloc too
+        :param window: amount of steps (for example candles) after which profiling stops; None -- until stop()
+        :param top: amount of functions and allocation sites in summary
+        """
+        self.file_name = file_name
+        self.report_dir = report_dir
+        self.memory = memory
+        self.window = window
+        self.top = top
+        self._profile = None
+        self._tracing = False
+        self._steps = 0
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self) -> None:
+        if self._profile is not None:
+            return
+        self._steps = 0
+        self._start_time = time.perf_counter()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:  # Python 3.12+ allows only one active profiler in the process
+            print(f"Profiling of {self.file_name} is skipped: ", e)
+            return
+        self._profile = profile
+        if self.memory:
+            self._start_tracing()
+
+    def step(self) -> None:
+        """Count one step of profiled loop; profiling stops when window is reached"""
+        if self._profile is None:
+            return
+        self._steps += 1
+        if self.window is not None and self._steps >= self.window:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop profiling and write report files"""
+        if self._profile is None:
+            return
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._start_time
+        snapshot = None
+        if self._tracing:
+            snapshot = tracemalloc.take_snapshot()
+            self._stop_tracing()
+        profile_path = self.report_dir + self.file_name + "profile.prof"
+        self._profile.dump_stats(profile_path)
+        summary_path = self.report_dir + self.file_name + "profile.txt"
+        with open(summary_path, "w") as f:
+            f.write(self.summary(self._profile, snapshot, elapsed))
+        self._profile = None
+        print("Profile saved to ", profile_path, " and ", summary_path)
+
+    def _start_tracing(self) -> None:
+        with Profiler._memory_lock:
+            if Profiler._memory_users == 0:
+                Profiler._owns_tracing = not tracemalloc.is_tracing()
+                if Profiler._owns_tracing:
+                    tracemalloc.start()
+            Profiler._memory_users += 1
+        self._tracing = True
+
+    def _stop_tracing(self) -> None:
+        with Profiler._memory_lock:
+            Profiler._memory_users -= 1
+            if Profiler._memory_users == 0 and Profiler._owns_tracing:
+                tracemalloc.stop()
+                Profiler._owns_tracing = False
+        self._tracing = False
+
+    def summary(self, profile: cProfile.Profile, snapshot=None, elapsed=0.0) -> str:
+        """
+        :return: text with top functions by cumulative and own time and top allocation sites
+        """
+        text = io.StringIO()
+        text.write(f"Profiled {elapsed:.3f} s, {self._steps} steps\n\n")
+        for sort_key in ["cumulative", "tottime"]:
+            text.write(f"Top {self.top} functions by {sort_key} time\n")
+            pstats.Stats(profile, stream=text).strip_dirs().sort_stats(sort_key).print_stats(self.top)
+        if snapshot is not None:
+            text.write(f"Top {self.top} allocation sites of the process\n")
+            for stat in snapshot.statistics("lineno")[:self.top]:
+                text.write(str(stat) + "\n")
+        return text.getvalue()
@@ -0,0 +1,168 @@
+import os
+import json
+import pathlib
+import requests
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from exchange.binanceclient import BinanceAPIClient
+from exchange.utils import get_intervals, get_all_pairs
+from exchange.weight_limiter import WeightLimiter, klines_weight
+from indicators.indicators import rolling_mean
+
+
+class Screener:
+    """Scans many pairs for SMA crossovers.
+
+    Candles of all pairs are loaded concurrently (with limit of request weight and local cache),
+    close prices are packed in one aligned array (pairs x candles) and crossovers are found
+    for all pairs at once.
+    """
+
+    def __init__(self, client: BinanceAPIClient = None, workers=16, weight_per_minute=1100, cache_dir: str = None):
+        """
+        :param client: client for requests (client on real binance for BTCUSDT if None)
+        :param workers: amount of concurrent requests
+        :param weight_per_minute: allowed weight of requests in a minute
+        :param cache_dir: directory for cached candles ('screener/cache/' if None); "" -- don't use cache
+        """
+        self._client = client if client is not None else BinanceAPIClient("BTC", "USDT", mode="prod")
+        self.workers = workers
+        self._limiter = WeightLimiter(weight_per_minute=weight_per_minute)
+        if cache_dir is None:
+            cache_dir = str(pathlib.PureWindowsPath(__file__).parent.as_posix()) + "/cache/"
+        self.cache_dir = cache_dir
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self._session = requests.Session()
+        self._session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=workers))
+
+    @staticmethod
+    def get_pairs(quote_asset: str = None) -> list:
+        """
+        :param quote_asset: if set, only pairs which end with this asset are returned (for example 'USDT')
+        :return: pairs from exchange/all_pairs.txt
+        """
+        pairs = list(get_all_pairs())
+        if quote_asset is not None:
+            pairs = [pair for pair in pairs if pair.endswith(quote_asset.upper())]
+        return pairs
+
+    def scan(self, pairs: list, candles_interval="5m", short_term=20, long_term=50) -> pd.DataFrame:
+        """Find pairs where short SMA crossed long SMA on the last closed candle
+
+        :param pairs: pairs for scanning
+        :param candles_interval: interval of candles
+        :param short_term: window of short simple moving average
+        :param long_term: window of long simple moving average
+        :return: dataframe with columns pair, close_price, short SMA, long SMA and signal ('BUY' or 'SELL')
+        """
+        # One more candle for the previous value of the longest moving average
+        depth = max(short_term, long_term) + 1
+        close_times, close_prices = self.load_close_prices(pairs, candles_interval=candles_interval, depth=depth)
+        short_sma = self.rolling_mean(close_prices, short_term, last=2)
+        long_sma = self.rolling_mean(close_prices, long_term, last=2)
+        # Crossover: on the previous candle short SMA was on the other side of long SMA
+        buy = (short_sma[:, 1] > long_sma[:, 1]) & (short_sma[:, 0] < long_sma[:, 0])
+        sell = (short_sma[:, 1] < long_sma[:, 1]) & (short_sma[:, 0] > long_sma[:, 0])
+        signals = np.full(len(pairs), "", dtype=object)
+        signals[buy] = "BUY"
+        signals[sell] = "SELL"
+        result = pd.DataFrame({"pair": pairs,
+                               "close_time": pd.to_datetime(close_times[-1], utc=True, unit="ms"),
+                               "close_price": close_prices[:, -1],
+                               str(short_term) + "_SMA": short_sma[:, 1],
+                               str(long_term) + "_SMA": long_sma[:, 1],
+                               "signal": signals})
+        return result[result["signal"] != ""].reset_index(drop=True)
+
+    @staticmethod
+    def rolling_mean(close_prices: np.ndarray, window: int, last=2) -> np.ndarray:
+        """
+        :param close_prices: array pairs x candles
+        :param window: window of moving average
+        :param last: amount of last candles for which moving average is computed
+        :return: array pairs x last of moving averages; NaN where window has missing candles of a pair
+        """
+        if window + last - 1 > close_prices.shape[1]:
+            raise Exception(f"Moving average of {window} candles needs at least {window + last - 1} candles")
+        return rolling_mean(close_prices, window)[:, -last:]
+
+    def load_close_prices(self, pairs: list, candles_interval="5m", depth=51) -> tuple:
+        """Load last closed candles of all pairs and align them on common close times
+
+        :return: array of close times (ms) and array pairs x depth of close prices (NaN where pair has no candle)
+        """
+        delta = int(get_intervals([candles_interval])[candles_interval])
+        now = self._client.get_now_timestamp()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            all_candles = list(executor.map(lambda pair: self.load_candles(pair, candles_interval, depth, now),
+                                            pairs))
+        # Common time grid ends at the newest closed candle among all pairs
+        last_close = max([candles[-1][6] for candles in all_candles if candles], default=now)
+        close_times = last_close - delta * np.arange(depth - 1, -1, -1, dtype=np.int64)
+        close_prices = np.full((len(pairs), depth), np.nan)
+        for row, candles in enumerate(all_candles):
+            if not candles:
+                continue
+            candles_close_times = np.array([candle[6] for candle in candles], dtype=np.int64)
+            columns = depth - 1 - np.round((last_close - candles_close_times) / delta).astype(np.int64)
+            mask = (columns >= 0) & (columns < depth)
+            close_prices[row, columns[mask]] = np.array([candle[4] for candle in candles], dtype=float)[mask]
+        return close_times, close_prices
+
+    def load_candles(self, pair: str, candles_interval: str, depth: int, now: int) -> list:
+        """Load closed candles of a pair; only candles which are not in local cache are requested
+
+        :param now: current timestamp in ms
+
+        :return: list of closed candles or empty list if pair can't be loaded
+        """
+        delta = int(get_intervals([candles_interval])[candles_interval])
+        checked, cached = self._read_cache(pair, candles_interval)
+        # Amount of candles closed after the last check of this pair
+        missing = min(depth, max(0, (now - checked) // delta))
+        if len(cached) < depth:
+            # Previous scans needed less candles: older candles are missing, so the whole depth is loaded
+            missing = depth
+        if missing > 0:
+            # One more candle because the last one from exchange is not closed
+            limit = missing + 1
+            self._limiter.acquire(self.request_weight(limit))
+            try:
+                new_candles = self._client.get_klines(pair, candles_interval=candles_interval,
+                                                      depth=limit, session=self._session)
+            except Exception as e:
+                print("Error: ", e)
+                return []
+            candles = {candle[0]: candle for candle in cached}
+            candles.update({candle[0]: candle for candle in new_candles if candle[6] < now})
+            cached = [candles[key] for key in sorted(candles)][-depth:]
+            self._write_cache(pair, candles_interval, now - now % delta, cached)
+        return cached
+
+    @staticmethod
+    def request_weight(limit: int) -> int:
+        """Weight of 'api/v3/klines' request with this limit"""
+        return klines_weight(limit)
+
+    def _cache_path(self, pair: str, candles_interval: str) -> str:
+        return self.cache_dir + pair + "_" + candles_interval + ".json"
+
+    def _read_cache(self, pair: str, candles_interval: str) -> tuple:
+        """
+        :return: close time of the last checked candle (0 if pair was not checked) and cached candles
+        """
+        if not self.cache_dir:
+            return 0, []
+        try:
+            with open(self._cache_path(pair, candles_interval), "r") as f:
+                cache = json.load(f)
+            return cache["checked"], cache["candles"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return 0, []
+
+    def _write_cache(self, pair: str, candles_interval: str, checked: int, candles: list) -> None:
+        if self.cache_dir:
+            with open(self._cache_path(pair, candles_interval), "w") as f:
+                json.dump({"checked": checked, "candles": candles}, f)
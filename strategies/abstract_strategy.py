@@ -1,9 +1,13 @@
+import pandas as pd
 from abc import ABC, abstractmethod
 
 
 class AbstractStrategy(ABC):
 
     def __init__(self, **kwargs):
+        self._indicators = None
+        self.profiler = None  # Profiler which counts steps of the trading loop (if profiling is on)
+        self.on_ready = None  # Function called when trading loop starts (history is loaded, stream is started)
         for key, value in kwargs.items():
             setattr(self, key, value)
 
@@ -34,3 +38,50 @@ class AbstractStrategy(ABC):
     @abstractmethod
     def stop_strategy(self,  total_assets, capital, wallet_data, recv_window):
         pass
+
+    def get_parameters(self) -> dict:
+        """Override this method to return settings which define decisions of strategy
+        (used in keys of cached backtests, so runtime state like open positions must not be here)
+
+        :return: dict of simple values
+        """
+        return {}
+
+    def declare_indicators(self) -> list:
+        """Override this method to declare indicators (from indicators.indicators) which strategy needs
+
+        :return: list of Indicator objects
+        """
+        return []
+
+    def compute_indicators(self, price_data: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized form: compute declared indicators on the whole price data (backtests and history)
+
+        :param price_data: dataframe with columns which indicators need
+        :return: price_data with indicator columns
+        """
+        for indicator in self.declare_indicators():
+            price_data = indicator.compute_df(price_data)
+        return price_data
+
+    def update_indicators(self, price_data: pd.DataFrame, step: int) -> pd.DataFrame:
+        """Incremental form: compute declared indicators only for a new candle (live trading).
+        On the first call indicators are warmed up with candles before 'step'.
+
+        :param price_data: dataframe with columns which indicators need
+        :param step: index of a new candle in price_data
+        :return: price_data with indicator columns filled on this step
+        """
+        if self._indicators is None:
+            self._indicators = self.declare_indicators()
+            history = price_data.loc[price_data.index < step]
+            for indicator in self._indicators:
+                for values in history[list(indicator.inputs)].itertuples(index=False):
+                    indicator.update(*values)
+        for indicator in self._indicators:
+            price_data = indicator.update_df(price_data, step)
+        return price_data
+
+    def reset_indicators(self) -> None:
+        """Forget state of incremental indicators (for example after change of settings)"""
+        self._indicators = None
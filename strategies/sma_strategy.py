@@ -1,12 +1,23 @@
 import pandas as pd
+from indicators.indicators import SMA
 from exchange.binanceclient import BinanceAPIClient
+from exchange.order_tracker import OrderTracker
+from exchange.order_executor import OrderExecutor, OrderHandle
+from exchange.market_data_bus import CandleReader
 from strategies.abstract_strategy import AbstractStrategy
 
 
 class SMAStrategy(AbstractStrategy):
 
     def __init__(self, short_term=20, long_term=50, trading_capital=0.2,
-                 losses=0.8, candle_interval="5m", client: BinanceAPIClient = None, **kwargs) -> None:
+                 losses=0.8, candle_interval="5m", client: BinanceAPIClient = None,
+                 order_tracker: OrderTracker = None, market_data: CandleReader = None,
+                 order_executor: OrderExecutor = None, **kwargs) -> None:
+        """
+        :param order_tracker: if set, statuses of orders come from this tracker instead of requests on every candle
+        :param market_data: if set, candles come from this reader of market data bus instead of own websocket stream
+        :param order_executor: if set, orders are sent in background and the candle loop does not wait for exchange
+        """
         super().__init__(**kwargs)
         self.short_term = short_term  # This is amount of variables for short term simple moving averages
         self.long_term = long_term  # This is amount of variables for long term simple moving averages
@@ -17,6 +28,9 @@ class SMAStrategy(AbstractStrategy):
         self.position_open = False
         self._buy_order_id = None
         self._sell_order_id = None
+        self._order_tracker = order_tracker
+        self._market_data = market_data
+        self._order_executor = order_executor
 
     def __str__(self):
         return f"SMAStrategy_{self.interval}_{self.short_term}_SMA_{self.long_term}_SMA_"
@@ -29,6 +43,14 @@ class SMAStrategy(AbstractStrategy):
         self.trading_capital = trading_capital
         self.interval = candle_interval
         self._losses = losses
+        self.reset_indicators()
+
+    def get_parameters(self) -> dict:
+        return {"short_term": self.short_term, "long_term": self.long_term, "trading_capital": self.trading_capital,
+                "losses": self._losses, "candle_interval": self.interval}
+
+    def declare_indicators(self) -> list:
+        return [SMA(self.short_term), SMA(self.long_term)]
 
     def run_strategy(self, stream_id=1, recv_window=5000):
         # Load wallet data
@@ -37,10 +59,16 @@ class SMAStrategy(AbstractStrategy):
         capital = wallet_data.loc[self._client.quote, "free"]
         # Load history
         price_data = self.get_history(interval=self.interval)
-        # Start websocket stream of candles
-        self._client.start_candle_stream(candles_interval=self.interval, stream_id=stream_id)
-        i = self.long_term
-        for candle in self._client:
+        # Start websocket stream of candles (or read them from market data bus)
+        if self._market_data is None:
+            self._client.start_candle_stream(candles_interval=self.interval, stream_id=stream_id)
+            candles = self._client
+        else:
+            candles = self._market_data
+        i = price_data.shape[0]
+        if self.on_ready is not None:
+            self.on_ready()
+        for candle in candles:
             # Check orders
             self.check_buy_order(recv_window=recv_window)
             self.check_sell_order(recv_window=recv_window)
@@ -60,8 +88,14 @@ class SMAStrategy(AbstractStrategy):
             self.send_order(price_data=price_data, wallet_data=wallet_data, step=i, recv_window=recv_window)
             # Update counter
             i += 1
+            if self.profiler is not None:
+                self.profiler.step()
 
     def get_history(self, interval: str) -> pd.DataFrame:
+        if self._market_data is not None:
+            # Candles of market data bus are already closed
+            price_data = SMAStrategy.candle_preprocessing(self._market_data.history(self.long_term))
+            return self.compute_indicators(price_data)
         # Use client for getting history data
         self._client.get_candlestick(candles_interval=interval, depth=self.long_term + 1)
         price_hist = self._client.candlesticks_to_pandas()
@@ -69,11 +103,7 @@ class SMAStrategy(AbstractStrategy):
         # Drop last candle because this is not closed
         price_data = price_data.drop(index=self.long_term, axis=0)
         # Calculate simple moving averages for short and long terms
-        price_data[str(self.short_term) + "_SMA"] = price_data["close_price"] \
-            .rolling(window=self.short_term).mean()
-        price_data[str(self.long_term) + "_SMA"] = price_data["close_price"] \
-            .rolling(window=self.long_term).mean()
-        return price_data
+        return self.compute_indicators(price_data)
 
     def signal_buy(self, price_data: pd.DataFrame, step: int) -> bool:
         # Check moving averages on this step
@@ -106,46 +136,97 @@ class SMAStrategy(AbstractStrategy):
         # Check if we want to buy
         if self.signal_buy(price_data=price_data, step=step):
             trading_capital = wallet_data.loc[self._client.quote, "free"] * self.trading_capital
-            response = self._client.new_order(side="BUY", quote_order_qty=trading_capital, recv_window=recv_window)
-            # Here we memorize id of buy order
-            self._buy_order_id = response["orderId"]
+            self.place_order(side="BUY", close_time=price_data.loc[step, "close_time"], recv_window=recv_window,
+                             quote_order_qty=trading_capital)
         # Check if we want to sell
         if self.signal_sell(price_data=price_data, step=step):
             amount_of_sell = wallet_data.loc[self._client.base, "free"]
-            response = self._client.new_order(side="SELL", quantity=amount_of_sell, recv_window=recv_window)
-            # Here we memorize id of sell order
+            self.place_order(side="SELL", close_time=price_data.loc[step, "close_time"], recv_window=recv_window,
+                             quantity=amount_of_sell)
+
+    def place_order(self, side: str, close_time, recv_window, **order_params) -> None:
+        """Send order directly or through order executor (then method returns without waiting for exchange)
+
+        :param side: "BUY" or "SELL"
+        :param close_time: close time of candle with signal (part of deterministic id of order)
+        :param recv_window: parameter of orders
+        :param order_params: other parameters of BinanceAPIClient.new_order
+        """
+        if self._order_executor is None:
+            response = self._client.new_order(side=side, recv_window=recv_window, **order_params)
+            self.on_order_response(side=side, response=response)
+        else:
+            client_order_id = OrderExecutor.make_client_order_id(str(self), self._client.pair, side, close_time)
+            handle = self._order_executor.submit(self._client, side=side, client_order_id=client_order_id,
+                                                 **order_params)
+            handle.add_done_callback(self.on_order_done)
+
+    def on_order_done(self, handle: OrderHandle) -> None:
+        """Callback of order executor"""
+        try:
+            response = handle.result()
+        except Exception as e:
+            print("Error: ", e)
+            return
+        self.on_order_response(side=handle.side, response=response)
+
+    def on_order_response(self, side: str, response: dict) -> None:
+        """Memorize id of new order and apply its status"""
+        if "orderId" not in response:
+            print("Error: order is not created: ", response)
+            return
+        # Here we memorize id of order
+        if side == "BUY":
+            self._buy_order_id = response["orderId"]
+        else:
             self._sell_order_id = response["orderId"]
+        # Market orders are usually filled at once, other orders are tracked until they are filled
+        if "status" in response:
+            self.update_order_status(response)
+        if response["orderId"] in [self._buy_order_id, self._sell_order_id]:
+            self.track_order(order_id=response["orderId"])
 
     def compute(self, price_data: pd.DataFrame, step) -> pd.DataFrame:
-        price_data.loc[step, str(self.short_term) + "_SMA"] = price_data.tail(self.short_term)["close_price"].mean()
-        price_data.loc[step, str(self.long_term) + "_SMA"] = price_data.tail(self.long_term)["close_price"].mean()
-        return price_data
+        # Update simple moving averages only for the new candle
+        return self.update_indicators(price_data, step=step)
 
     def check_buy_order(self, recv_window) -> None:
         """Check if buy order filled.
         If order is filled set position_open = True, and forget buy_order_id.
         """
-        if self._buy_order_id is not None:
+        # With order tracker statuses come in update_order_status
+        if self._buy_order_id is not None and self._order_tracker is None:
             order_status = self._client.get_order_status(order_id=self._buy_order_id, recv_window=recv_window)
-            if order_status["status"] == "FILLED":
-                self.position_open = True
-                self._buy_order_id = None
-            elif order_status["status"] == "EXPIRED":
-                self.position_open = True
-                self._buy_order_id = None
+            self.update_order_status(order_status)
 
     def check_sell_order(self, recv_window):
         """Check if sell order filled.
         If order is filled set position_open = False, and forget sell_order_id.
         """
-        if self._sell_order_id is not None:
+        # With order tracker statuses come in update_order_status
+        if self._sell_order_id is not None and self._order_tracker is None:
             order_status = self._client.get_order_status(order_id=self._sell_order_id, recv_window=recv_window)
-            if order_status["status"] == "FILLED":
-                self.position_open = False
-                self._sell_order_id = None
-            elif order_status["status"] == "EXPIRED":
-                self.position_open = False
-                self._sell_order_id = None
+            self.update_order_status(order_status)
+
+    def update_order_status(self, order_status: dict) -> None:
+        """Apply new status of buy or sell order. This method is also a callback for OrderTracker
+
+        :param order_status: information about order from exchange
+        """
+        if order_status["status"] not in ["FILLED", "EXPIRED"]:
+            return
+        if order_status["orderId"] == self._buy_order_id:
+            self.position_open = True
+            self._buy_order_id = None
+        elif order_status["orderId"] == self._sell_order_id:
+            self.position_open = False
+            self._sell_order_id = None
+
+    def track_order(self, order_id) -> None:
+        """Pass order to order tracker (if strategy has one)"""
+        if self._order_tracker is not None:
+            self._order_tracker.track(symbol=self._client.pair, order_id=order_id,
+                                      callback=self.update_order_status)
 
     def stop_strategy(self, total_assets, capital, wallet_data, recv_window) -> None:
         """ This method decides stop trading or not
@@ -159,7 +240,10 @@ class SMAStrategy(AbstractStrategy):
             if self.position_open:
                 amount_of_sell = wallet_data.loc[self._client.base, "free"]
                 self._client.new_order(side="SELL", quantity=amount_of_sell, recv_window=recv_window)
-            self._client.stop_candle_stream()
+            if self._market_data is None:
+                self._client.stop_candle_stream()
+            else:
+                self._market_data.stop()
 
     @staticmethod
     def candle_preprocessing(candles_data: pd.DataFrame) -> pd.DataFrame:
@@ -1,6 +1,11 @@
 from exchange.binanceclient import BinanceAPIClient
+from exchange.weight_limiter import WeightLimiter
 from strategies.abstract_strategy import AbstractStrategy
 from backtester.backtester import BackTester
+from backtester.result_cache import ResultCache
+from backtester.robustness import RobustnessTester
+from backtester.portfolio import PortfolioBackTester
+from profiler.profiler import Profiler
 from datetime import datetime
 
 
@@ -11,12 +16,16 @@ class StartStrategy:
         :param strategy:
         :param client:
         :param mode: "LIVE" -- start strategy on real exchange,
-            "TEST" -- start strategy on test spotnet, "BACK_TEST" -- start backtester
+            "TEST" -- start strategy on test spotnet, "BACK_TEST" -- start backtester,
+            "ROBUSTNESS" -- start Monte Carlo test of strategy on resampled history,
+            "PORTFOLIO" -- start backtester on many pairs with shared quote asset
         """
         self.mode = mode
         self._strategy = strategy
         self._client = client
         self._back_test = None
+        self._robustness_test = None
+        self._portfolio_test = None
         self._start_test = None
         self._end_test = None
 
@@ -30,21 +39,67 @@ class StartStrategy:
                                     client=self._client)
 
     def set_backtester_settings(self, start_day: datetime, end_day: datetime, base_asset: str, quote_asset: str,
-                                base_asset_amount=0.0, quote_asset_amount=100.0):
+                                base_asset_amount=0.0, quote_asset_amount=100.0, cache: ResultCache = None,
+                                limiter: WeightLimiter = None):
         self._back_test = BackTester(strategy=self._strategy, base_asset=base_asset, quote_asset=quote_asset,
-                                     base_asset_amount=base_asset_amount, quote_asset_amount=quote_asset_amount)
+                                     base_asset_amount=base_asset_amount, quote_asset_amount=quote_asset_amount,
+                                     cache=cache, limiter=limiter)
         self._start_test = start_day
         self._end_test = end_day
 
-    def start(self):
-        if self.mode == "LIVE":
-            self._client.set_mode(mode="prod")
-            self.start_strategy()
-        if self.mode == "TEST":
-            self._client.set_mode(mode="test")
-            self.start_strategy()
-        if self.mode == "BACK_TEST":
-            self.start_back_test()
+    def set_robustness_settings(self, start_day: datetime, end_day: datetime, base_asset: str, quote_asset: str,
+                                quote_asset_amount=100.0, paths=1000, block_size=96, min_window=0.5, workers=None,
+                                seed=0, limiter: WeightLimiter = None):
+        self._robustness_test = RobustnessTester(strategy=self._strategy, base_asset=base_asset,
+                                                 quote_asset=quote_asset, quote_asset_amount=quote_asset_amount,
+                                                 paths=paths, block_size=block_size, min_window=min_window,
+                                                 workers=workers, seed=seed, limiter=limiter)
+        self._start_test = start_day
+        self._end_test = end_day
+
+    def set_portfolio_settings(self, start_day: datetime, end_day: datetime, base_assets: list, quote_asset: str,
+                               quote_asset_amount=100.0, workers=4, limiter: WeightLimiter = None):
+        self._portfolio_test = PortfolioBackTester(strategy=self._strategy, base_assets=base_assets,
+                                                   quote_asset=quote_asset, quote_asset_amount=quote_asset_amount,
+                                                   workers=workers, limiter=limiter)
+        self._start_test = start_day
+        self._end_test = end_day
+
+    def start(self, profile=False, profile_memory=False, profile_window=None, profile_top=20, profile_name=None):
+        """
+        :param profile: if True, CPU profile is collected and saved to the directory of backtest reports
+        :param profile_memory: if True, allocations are traced too (works only with profile=True)
+        :param profile_window: amount of candles of live trading to profile; None -- until strategy stops
+        :param profile_top: amount of functions and allocation sites in summary of profile
+        :param profile_name: prefix of profile files (for example name of bot), so bots of a fleet
+            with the same strategy and pair do not overwrite profiles of each other
+        """
+        profiler = None
+        if profile:
+            file_name = str(self._strategy) + self._get_pair() + self.mode + "_"
+            if profile_name:
+                file_name = profile_name + "_" + file_name
+            profiler = Profiler(file_name=file_name, report_dir=BackTester.get_report_dir(),
+                                memory=profile_memory, window=profile_window, top=profile_top)
+            self._strategy.profiler = profiler
+            profiler.start()
+        try:
+            if self.mode == "LIVE":
+                self._client.set_mode(mode="prod")
+                self.start_strategy()
+            if self.mode == "TEST":
+                self._client.set_mode(mode="test")
+                self.start_strategy()
+            if self.mode == "BACK_TEST":
+                self.start_back_test()
+            if self.mode == "ROBUSTNESS":
+                self.start_robustness_test()
+            if self.mode == "PORTFOLIO":
+                self.start_portfolio_test()
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                self._strategy.profiler = None
 
     def start_strategy(self):
         self._strategy.run_strategy()
@@ -52,6 +107,23 @@ class StartStrategy:
     def start_back_test(self):
         self._back_test.run_backtesting(start_day=self._start_test, end_day=self._end_test)
 
+    def start_robustness_test(self):
+        self._robustness_test.run(start_day=self._start_test, end_day=self._end_test)
+
+    def start_portfolio_test(self):
+        self._portfolio_test.run(start_day=self._start_test, end_day=self._end_test)
+
+    def _get_pair(self) -> str:
+        """
+        :return: pair of this mode (only quote asset for portfolio)
+        """
+        if self.mode in ["LIVE", "TEST"]:
+            return self._client.base + self._client.quote
+        if self.mode == "PORTFOLIO":
+            return self._portfolio_test.quote
+        test = self._back_test if self.mode == "BACK_TEST" else self._robustness_test
+        return test.base + test.quote
+
     @property
     def strategy(self) -> AbstractStrategy:
         return self._strategy
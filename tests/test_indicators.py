@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from indicators.indicators import SMA, EMA, RSI, BollingerBands, ATR, VWAP, rolling_mean
+
+
+def random_walk(number_of_candles=2000, seed=0) -> dict:
+    """Seeded candles: random walk of close prices with high/low around them and random volume"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, number_of_candles)))
+    spread = close * rng.uniform(0, 0.01, number_of_candles)
+    return {"close_price": close,
+            "high_price": close + spread,
+            "low_price": close - spread,
+            "volume": rng.uniform(0, 10, number_of_candles)}
+
+
+@pytest.mark.parametrize("indicator", [SMA(20), EMA(20), RSI(14), BollingerBands(20), ATR(14), VWAP(20)],
+                         ids=lambda indicator: type(indicator).__name__)
+def test_compute_and_update_agree(indicator):
+    candles = random_walk()
+    arrays = [candles[column] for column in indicator.inputs]
+    vectorized = indicator.compute(*arrays)
+    indicator.reset()
+    incremental = np.array([indicator.update(*values) for values in zip(*arrays)])
+    assert vectorized.shape == incremental.shape == (len(arrays[0]), len(indicator.columns))
+    np.testing.assert_array_equal(np.isnan(vectorized), np.isnan(incremental))
+    np.testing.assert_allclose(vectorized, incremental, rtol=1e-9, equal_nan=True)
+
+
+def test_reset_restarts_incremental_form():
+    candles = random_walk(100)
+    indicator = SMA(10)
+    first = [indicator.update(close) for close in candles["close_price"]]
+    indicator.reset()
+    second = [indicator.update(close) for close in candles["close_price"]]
+    np.testing.assert_array_equal(first, second)
+
+
+def test_rolling_mean_of_rows_matches_sma():
+    rows = np.array([random_walk(seed=seed)["close_price"] for seed in range(3)])
+    rows[1, :100] = np.nan  # pair with shorter history
+    means = rolling_mean(rows, 20)
+    assert means.shape == rows.shape
+    np.testing.assert_allclose(means[0], SMA(20).compute(rows[0])[:, 0], rtol=1e-12, equal_nan=True)
+    assert np.isnan(means[1, :119]).all() and not np.isnan(means[1, 119:]).any()
+    np.testing.assert_allclose(means[1, 119:], SMA(20).compute(rows[1, 100:])[19:, 0], rtol=1e-9)
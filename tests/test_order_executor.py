@@ -0,0 +1,101 @@
+import time
+import pytest
+import requests
+from exchange.order_executor import OrderExecutor
+
+ORDER = {"orderId": 1, "status": "FILLED", "side": "BUY"}
+
+
+class FakeClient:
+    """Client which answers with prepared responses; exceptions in the lists are raised"""
+    pair = "BTCUSDT"
+
+    def __init__(self, orders: list, statuses: list):
+        """
+        :param orders: answers of new_order in order of calls (the last one is repeated)
+        :param statuses: answers of get_order_status in order of calls (the last one is repeated)
+        """
+        self._orders = orders
+        self._statuses = statuses
+        self.posts = []  # times of calls of new_order
+        self.lookups = 0
+
+    @staticmethod
+    def _answer(answers: list, number: int):
+        answer = answers[min(number, len(answers) - 1)]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def new_order(self, side, new_client_order_id=None, timeout=None, recv_window=5000, **params):
+        self.posts.append(time.monotonic())
+        return self._answer(self._orders, len(self.posts) - 1)
+
+    def get_order_status(self, orig_client_order_id=None, recv_window=5000, timeout=None):
+        self.lookups += 1
+        return self._answer(self._statuses, self.lookups - 1)
+
+
+@pytest.fixture
+def executor():
+    executor = OrderExecutor(workers=1, retries=3, timeout=1.0, retry_delay=0.01, recv_window=200)
+    yield executor
+    executor.shutdown()
+
+
+def submit(executor: OrderExecutor, client: FakeClient) -> dict:
+    handle = executor.submit(client, side="BUY", client_order_id="cb_test", quote_order_qty=10)
+    return handle.result(timeout=10)
+
+
+def test_timeout_and_order_found(executor):
+    client = FakeClient(orders=[requests.exceptions.Timeout()], statuses=[ORDER])
+    assert submit(executor, client) == ORDER
+    assert len(client.posts) == 1
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.HTTPError("503 Server Error"), ValueError("not json")])
+def test_server_error_and_order_found(executor, error):
+    client = FakeClient(orders=[error], statuses=[ORDER])
+    assert submit(executor, client) == ORDER
+    assert len(client.posts) == 1
+
+
+def test_timeout_and_unknown_order_is_sent_again_after_recv_window(executor):
+    client = FakeClient(orders=[requests.exceptions.Timeout(), ORDER],
+                        statuses=[{"code": -2013, "msg": "Order does not exist."}])
+    assert submit(executor, client) == ORDER
+    assert len(client.posts) == 2
+    assert client.posts[1] - client.posts[0] >= executor.recv_window / 1000
+
+
+def test_order_is_not_sent_again_without_answer_of_exchange(executor):
+    client = FakeClient(orders=[requests.exceptions.Timeout(), ORDER],
+                        statuses=[requests.exceptions.ConnectionError()])
+    with pytest.raises(Exception, match="is not sent"):
+        submit(executor, client)
+    assert len(client.posts) == 1
+    assert client.lookups == executor.retries + 1
+
+
+def test_duplicate_order_is_loaded_from_exchange(executor):
+    client = FakeClient(orders=[{"code": -2010, "msg": "Duplicate order sent."}], statuses=[ORDER])
+    assert submit(executor, client) == ORDER
+    assert len(client.posts) == 1
+
+
+def test_rejected_order_is_not_sent_again(executor):
+    client = FakeClient(orders=[{"code": -2010, "msg": "Account has insufficient balance."}], statuses=[ORDER])
+    with pytest.raises(Exception, match="rejected"):
+        submit(executor, client)
+    assert len(client.posts) == 1
+    assert client.lookups == 0
+
+
+def test_latency_is_recorded(executor):
+    client = FakeClient(orders=[ORDER], statuses=[ORDER])
+    handle = executor.submit(client, side="BUY", client_order_id="cb_test", quote_order_qty=10)
+    handle.result(timeout=10)
+    assert handle.latency is not None and handle.attempts == 1
+    assert executor.latency_stats()["count"] == 1
+    assert executor.in_flight == []
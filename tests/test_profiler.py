@@ -0,0 +1,26 @@
+import tracemalloc
+from profiler.profiler import Profiler
+
+
+def test_memory_tracing_is_shared_by_profilers(tmp_path):
+    report_dir = str(tmp_path) + "/"
+    first = Profiler(file_name="first_", report_dir=report_dir, memory=True)
+    second = Profiler(file_name="second_", report_dir=report_dir, memory=True)
+    first.start()
+    second.start()
+    first.stop()
+    assert tracemalloc.is_tracing()
+    second.stop()
+    assert not tracemalloc.is_tracing()
+    assert (tmp_path / "first_profile.txt").exists() and (tmp_path / "second_profile.txt").exists()
+    assert "allocation sites" in (tmp_path / "second_profile.txt").read_text()
+
+
+def test_tracing_started_outside_is_not_stopped(tmp_path):
+    tracemalloc.start()
+    try:
+        with Profiler(file_name="bot_", report_dir=str(tmp_path) + "/", memory=True):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()